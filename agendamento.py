@@ -0,0 +1,180 @@
+import datetime
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+# Ordem de processamento dos arquivos de um lote (ver `lote.process_directory`):
+# os mais caros primeiro, para que nenhum arquivo grande fique para o fim do
+# lote, ou os mais baratos primeiro, para que os primeiros resultados saiam logo
+LARGEST_FIRST = 'maiores'
+SMALLEST_FIRST = 'menores'
+ORDERS = (LARGEST_FIRST, SMALLEST_FIRST)
+
+DEFAULT_MODEL_PATH = os.environ.get(
+    'EXTRACAO_CUSTOS',
+    os.path.join(os.path.expanduser('~'), '.extracao_relatorios', 'custos.sqlite3'))
+# Medições mais recentes de cada tipo de relatório usadas (e mantidas) no ajuste
+MAX_SAMPLES = 2000
+# Medições necessárias para substituir os coeficientes iniciais pelos ajustados
+MIN_SAMPLES = 20
+# Coeficientes iniciais do custo de um arquivo, em segundos: fixo, por página e
+# por MB
+DEFAULT_COEFFICIENTS = (0.02, 0.05, 0.02)
+
+# Arquivo de um lote com o custo estimado (em segundos) da sua extração
+ScheduledFile = namedtuple('ScheduledFile', 'name size pages estimate load')
+
+
+def page_count(source):
+    """
+    Total de páginas de um PDF (caminho ou arquivo em memória), lido da árvore
+    de páginas indicada no trailer, sem interpretar o conteúdo das páginas.
+    Devolve None se o PDF não puder ser lido.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return page_count(f)
+    position = source.tell()
+    try:
+        document = PDFDocument(PDFParser(source))
+        return int(resolve1(resolve1(document.catalog['Pages'])['Count']))
+    except Exception:
+        return None
+    finally:
+        source.seek(position)
+
+
+def _features(pages, size):
+    return (1.0, float(pages or 1), size / (1024 * 1024))
+
+
+def _fit(samples, prior=DEFAULT_COEFFICIENTS):
+    """
+    Coeficientes de mínimos quadrados (sem valores negativos) do custo real
+    em função de `_features`, ou None se as medições não os determinarem. Uma
+    regularização mínima em direção a `prior` resolve os casos em que as
+    medições não separam os coeficientes (por exemplo, quando todos os
+    arquivos têm uma página), sem afetar o ajuste nos demais.
+    """
+    n = len(prior)
+    matrix = [[0.0] * n for _ in range(n)]
+    vector = [0.0] * n
+    for pages, size, seconds in samples:
+        features = _features(pages, size)
+        for i in range(n):
+            vector[i] += features[i] * seconds
+            for j in range(n):
+                matrix[i][j] += features[i] * features[j]
+    weight = 1e-3 * sum(matrix[i][i] for i in range(n)) / n
+    for i in range(n):
+        matrix[i][i] += weight
+        vector[i] += weight * prior[i]
+    # Eliminação de Gauss com pivoteamento parcial
+    for column in range(n):
+        pivot = max(range(column, n), key=lambda row: abs(matrix[row][column]))
+        if abs(matrix[pivot][column]) < 1e-12:
+            return None
+        matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+        vector[column], vector[pivot] = vector[pivot], vector[column]
+        for row in range(column + 1, n):
+            factor = matrix[row][column] / matrix[column][column]
+            vector[row] -= factor * vector[column]
+            for j in range(column, n):
+                matrix[row][j] -= factor * matrix[column][j]
+    coefficients = [0.0] * n
+    for row in reversed(range(n)):
+        total = vector[row] - sum(matrix[row][j] * coefficients[j] for j in range(row + 1, n))
+        coefficients[row] = total / matrix[row][row]
+    return tuple(max(value, 0.0) for value in coefficients)
+
+
+class CostModel:
+    """
+    Modelo do custo de extração de um PDF a partir do tamanho e do total de
+    páginas, com coeficientes por tipo de relatório ajustados às medições
+    (custo estimado e real) registradas pelos lotes anteriores em um banco
+    SQLite. Sem medições suficientes, usa DEFAULT_COEFFICIENTS. As medições
+    de um lote são gravadas ao fim dele.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_MODEL_PATH
+        self._conn = None
+        self._coefficients = {}
+        self._pending = []
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS custos (
+                id INTEGER PRIMARY KEY, tipo TEXT, paginas INTEGER, bytes INTEGER,
+                estimado REAL, real REAL, registrado_em TEXT);
+            CREATE INDEX IF NOT EXISTS custos_tipo ON custos (tipo, id);
+        ''')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._pending:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO custos (tipo, paginas, bytes, estimado, real, "
+                        "registrado_em) VALUES (?, ?, ?, ?, ?, ?)", self._pending)
+                    for report_type in {entry[0] for entry in self._pending}:
+                        self._conn.execute(
+                            "DELETE FROM custos WHERE tipo = ? AND id NOT IN (SELECT id FROM "
+                            "custos WHERE tipo = ? ORDER BY id DESC LIMIT ?)",
+                            (report_type, report_type, MAX_SAMPLES))
+        finally:
+            self._conn.close()
+        return False
+
+    def coefficients(self, report_type):
+        if report_type not in self._coefficients:
+            samples = self._conn.execute(
+                "SELECT paginas, bytes, real FROM custos WHERE tipo = ? "
+                "ORDER BY id DESC LIMIT ?", (report_type, MAX_SAMPLES)).fetchall()
+            fitted = _fit(samples) if len(samples) >= MIN_SAMPLES else None
+            self._coefficients[report_type] = fitted or DEFAULT_COEFFICIENTS
+        return self._coefficients[report_type]
+
+    def estimate(self, report_type, pages, size):
+        return sum(coefficient * feature for coefficient, feature in
+                   zip(self.coefficients(report_type), _features(pages, size)))
+
+    def record(self, report_type, scheduled, seconds):
+        """
+        Registra o custo real de um arquivo agendado (ScheduledFile). Arquivos
+        cujas páginas não puderam ser contadas não entram no ajuste.
+        """
+        if scheduled.pages is None:
+            return
+        now = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        self._pending.append((report_type, scheduled.pages, scheduled.size,
+                              scheduled.estimate, seconds, now))
+
+
+def plan(entries, report_type, model, order=LARGEST_FIRST):
+    """
+    Ordena os PDFs `entries` (`fontes.PdfEntry`) pelo custo estimado por
+    `model` para o tipo `report_type`, conforme `order`, e devolve uma lista
+    de ScheduledFile e o tempo gasto no agendamento. Membros de ZIPs são
+    descompactados aqui só para a contagem das páginas e de novo na extração.
+    """
+    start = time.perf_counter()
+    scheduled = []
+    for entry in entries:
+        pages = page_count(entry.load())
+        scheduled.append(ScheduledFile(entry.name, entry.size, pages,
+                                       model.estimate(report_type, pages, entry.size),
+                                       entry.load))
+    scheduled.sort(key=lambda item: item.estimate, reverse=order == LARGEST_FIRST)
+    return scheduled, time.perf_counter() - start
@@ -13,6 +13,17 @@ st.set_page_config(
 # Aplicar estilos customizados
 #apply_custom_styles()
 
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    # Uma vez por servidor: importa as dependências e pré-inicia os processos
+    # de extração em segundo plano
+    from tarefas import warm_up
+    return warm_up()
+
+
+start_warm_up()
+
 # Título principal
 st.title("📄 Automação de Extração de Dados de Relatórios de Exposição Ocupacional")
 st.markdown("---")
@@ -25,6 +36,8 @@ with st.sidebar:
         [
             "🏠 Início",
             "📄 Tipo do Relatório",
+            "🗂️ Histórico",
+            "🩺 Diagnóstico",
             "ℹ️ Sobre"
         ]
     )
@@ -48,7 +61,8 @@ elif main_menu == "📄 Tipo do Relatório":
     report_type = st.selectbox(
         "Selecione o tipo de relatório",
         ["🧪Relatórios de Análises Químicas", "🔊Relatórios de Dosimetrias",
-            "🧫Relatórios de Análises Microbiológicas"]
+            "🧫Relatórios de Análises Microbiológicas",
+            "🔀Lote Misto (identificação automática)"]
     )
 
     # Mostrar a página correspondente ao tipo de relatório
@@ -64,6 +78,23 @@ elif main_menu == "📄 Tipo do Relatório":
         from microbiologia import show_microbiologia_page
         show_microbiologia_page()
 
+    elif report_type == "🔀Lote Misto (identificação automática)":
+        from misto import show_mixed_page
+        show_mixed_page()
+
+elif main_menu == "🗂️ Histórico":
+    st.markdown("### 🗂️ Histórico de Resultados")
+    from componentes import show_history_page
+    show_history_page()
+
+elif main_menu == "🩺 Diagnóstico":
+    st.markdown("### 🩺 Diagnóstico de Desempenho")
+    if "ultimo_perfil" in st.session_state:
+        from componentes import show_profile
+        show_profile(st.session_state["ultimo_perfil"])
+    else:
+        st.info("Execute um processamento em lote para ver os tempos por etapa.")
+
 elif main_menu == "ℹ️ Sobre":
     st.markdown("### ℹ️ Sobre o Sistema")
     st.write("""
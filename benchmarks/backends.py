@@ -0,0 +1,96 @@
+"""
+Equivalência e desempenho dos backends de texto na extração de dosimetria.
+
+Extrai cada relatório com os dois backends de `texto` (pdfplumber e
+pdfminer), confere que os campos extraídos (e as páginas lidas) são
+idênticos e compara o tempo mediano por arquivo. Usa relatórios sintéticos
+nos dois layouts do gerador (uma linha por campo e rótulos e valores em
+colunas) ou, com `--diretorio`, os PDFs de um diretório real:
+
+    python benchmarks/backends.py --arquivos 200
+    python benchmarks/backends.py --diretorio /dados/dosimetrias
+
+Termina com código 1 se algum arquivo tiver campos diferentes.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dosimetria  # noqa: E402
+from fontes import iter_pdfs  # noqa: E402
+from pdf_sintetico import write_batch  # noqa: E402
+from texto import BACKENDS, PDFPLUMBER  # noqa: E402
+
+
+def _extract(source, backend):
+    if not isinstance(source, str):
+        source.seek(0)
+    start = time.perf_counter()
+    try:
+        data = dosimetria.extract_pdf_data(source, backend=backend)
+    except Exception as e:
+        data = {'erro': str(e).split(': ', 1)[-1]}
+    return data, time.perf_counter() - start
+
+
+def compare(sources):
+    """
+    Extrai cada fonte com todos os backends e devolve os tempos por backend e
+    as diferenças encontradas: (nome, campo, valor de cada backend).
+    """
+    times = {backend: [] for backend in BACKENDS}
+    differences = []
+    for source in sources:
+        name = os.path.basename(source) if isinstance(source, str) else source.name
+        results = {}
+        for backend in BACKENDS:
+            results[backend], seconds = _extract(source, backend)
+            times[backend].append(seconds)
+        for key in sorted(set().union(*results.values())):
+            values = [result.get(key) for result in results.values()]
+            if any(value != values[0] for value in values[1:]):
+                differences.append((name, key, dict(zip(results, values))))
+    return times, differences
+
+
+def report(label, times, differences):
+    medians = {backend: statistics.median(values) * 1000 for backend, values in times.items()}
+    baseline = medians[PDFPLUMBER]
+    print(f"{label}: {len(next(iter(times.values())))} arquivos, "
+          f"{len(differences)} diferenças")
+    for backend, median in medians.items():
+        print(f"  {backend:<11} {median:7.2f} ms/arquivo  ({baseline / median:.2f}x)")
+    for name, key, values in differences[:20]:
+        print(f"  {name} [{key}]: {values}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--arquivos', type=int, default=200)
+    parser.add_argument('--diretorio', help="Diretório com relatórios de dosimetria reais")
+    args = parser.parse_args(argv)
+
+    failed = False
+    if args.diretorio:
+        times, differences = compare(iter_pdfs(args.diretorio))
+        report(args.diretorio, times, differences)
+        failed = bool(differences)
+    else:
+        for layout, options in (('linhas', {}), ('colunas', {'colunas': True})):
+            with tempfile.TemporaryDirectory() as directory:
+                paths = write_batch(directory, 'dosimetria', args.arquivos, **options)
+                times, differences = compare(paths)
+            report(f"sintéticos ({layout})", times, differences)
+            failed = failed or bool(differences)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
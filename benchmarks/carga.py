@@ -0,0 +1,271 @@
+"""
+Teste de carga da interface web com várias sessões simultâneas.
+
+Simula usuários usando o aplicativo ao mesmo tempo, sem navegador, com a API
+de testes do Streamlit (`streamlit.testing.v1.AppTest`), em um único
+processo, como em um servidor. Cada sessão abre a página de um tipo de
+relatório (alternando entre químico e dosimetria), extrai um PDF na aba de
+arquivo único e envia um lote de PDFs sintéticos na aba de processamento em
+lote, acompanhando a tarefa até o fim. Para cada quantidade de sessões, mostra
+os percentis da latência das interações e do tempo dos lotes, o pico de
+memória do servidor (este processo e os de extração) e a taxa de erros:
+
+    python benchmarks/carga.py --sessoes 1 2 4 8 --arquivos 20
+
+A API de testes usa um runtime global do Streamlit, de modo que as execuções
+do script das sessões são feitas uma de cada vez; os lotes em segundo plano e
+os processos de extração rodam ao mesmo tempo, como no servidor. A latência
+de cada interação inclui a espera pela vez da sessão.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_sintetico import write_batch  # noqa: E402
+
+APP = os.path.join(ROOT, 'app.py')
+PAGES = {
+    'quimica': "🧪Relatórios de Análises Químicas",
+    'dosimetria': "🔊Relatórios de Dosimetrias",
+}
+# Intervalo entre as atualizações da página enquanto o lote é processado
+# (o mesmo do painel da tarefa, ver `componentes.JOB_POLL_SECONDS`)
+POLL_SECONDS = 1.0
+# Intervalo entre as medições de memória
+RSS_SECONDS = 0.2
+
+# Execuções do script (a API de testes não permite execuções simultâneas)
+_run_lock = threading.Lock()
+
+
+def _rss_mb(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _children(pid):
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def server_rss_mb():
+    """
+    Memória residente deste processo e de todos os seus descendentes, em MB
+    (apenas no Linux).
+    """
+    total, pending = 0.0, [os.getpid()]
+    while pending:
+        pid = pending.pop()
+        try:
+            total += _rss_mb(pid)
+            pending.extend(_children(pid))
+        except (OSError, ValueError):
+            # Processo encerrado durante a medição
+            pass
+    return total
+
+
+class _PeakRss(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = server_rss_mb()
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(RSS_SECONDS):
+            self.peak = max(self.peak, server_rss_mb())
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+        return self.peak
+
+
+class Session:
+    """
+    Uma sessão simulada: percorre as páginas e registra a latência de cada
+    interação (execução do script), o tempo do lote e o erro, se houver.
+    """
+
+    def __init__(self, report_type, single, batch, workers, timeout):
+        self.report_type = report_type
+        self.single = single
+        self.batch = batch
+        self.workers = workers
+        self.timeout = timeout
+        self.latencies = []
+        self.batch_seconds = None
+        self.error = None
+
+    def _run(self, at):
+        start = time.perf_counter()
+        with _run_lock:
+            at.run()
+        self.latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if at.error:
+            raise RuntimeError(at.error[0].value)
+
+    def _widget(self, widgets, label):
+        return next(widget for widget in widgets if widget.label.startswith(label))
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+        import tarefas
+
+        try:
+            at = AppTest.from_file(APP, default_timeout=self.timeout)
+            self._run(at)
+            at.sidebar.radio[0].set_value("📄 Tipo do Relatório")
+            self._run(at)
+            at.selectbox[0].set_value(PAGES[self.report_type])
+            self._run(at)
+
+            # Aba de arquivo único
+            at.file_uploader[0].set_value(_upload(self.single))
+            self._run(at)
+            if not any(item.value.startswith("Dados extraídos") for item in at.success):
+                raise RuntimeError("extração do arquivo único sem resultado")
+
+            # Aba de processamento em lote
+            at.file_uploader[1].set_value([_upload(path) for path in self.batch])
+            self._widget(at.number_input, "Processos de extração").set_value(self.workers)
+            self._widget(at.checkbox, "Reutilizar resultados").set_value(False)
+            self._widget(at.checkbox, "Salvar no histórico").set_value(False)
+            start = time.perf_counter()
+            self._widget(at.button, "🚀").click()
+            self._run(at)
+            job_id = at.query_params.get(f"tarefa_{self.report_type}")
+            if isinstance(job_id, list):
+                job_id = job_id[0]
+            job = tarefas.get_job(job_id) if job_id else None
+            if job is None:
+                raise RuntimeError("o lote não foi iniciado")
+            while not job.is_finished:
+                if time.perf_counter() - start > self.timeout:
+                    raise RuntimeError("tempo limite do lote excedido")
+                time.sleep(POLL_SECONDS)
+                self._run(at)
+            self._run(at)
+            self.batch_seconds = time.perf_counter() - start
+            if job.snapshot()['erro']:
+                raise RuntimeError(job.snapshot()['erro'])
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+
+def _upload(path):
+    with open(path, 'rb') as f:
+        return os.path.basename(path), f.read(), 'application/pdf'
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def run_level(sessions_count, files, workers, timeout):
+    """
+    Executa `sessions_count` sessões ao mesmo tempo e devolve as estatísticas.
+    """
+    sessions = []
+    for index in range(sessions_count):
+        report_type = sorted(files)[index % len(files)]
+        paths = files[report_type]
+        sessions.append(Session(report_type, paths[index % len(paths)], paths, workers,
+                                timeout))
+    threads = [threading.Thread(target=session.run) for session in sessions]
+    rss = _PeakRss()
+    rss.start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    peak = rss.stop()
+
+    latencies = [latency for session in sessions for latency in session.latencies]
+    batches = [session.batch_seconds for session in sessions if session.batch_seconds]
+    errors = [session.error for session in sessions if session.error]
+    return {
+        'sessoes': sessions_count,
+        'segundos': round(seconds, 2),
+        'interacoes': len(latencies),
+        'latencia_p50_ms': round(_percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'latencia_p95_ms': round(_percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        'latencia_max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+        'lote_p50_s': round(statistics.median(batches), 2) if batches else None,
+        'lote_max_s': round(max(batches), 2) if batches else None,
+        'rss_pico_mb': round(peak, 1),
+        'erros': len(errors),
+        'taxa_erros': round(len(errors) / sessions_count, 3),
+        'mensagens_erro': sorted(set(errors)),
+    }
+
+
+def _format(value, spec):
+    if value is None:
+        return '-'.rjust(int(spec.split('.')[0]))
+    return format(value, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--arquivos', type=int, default=20,
+                        help="PDFs no lote enviado por cada sessão")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processos de extração pedidos por cada sessão")
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="Tempo máximo de cada sessão, em segundos")
+    parser.add_argument('--json', metavar='ARQUIVO', help="Salva o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Cache e histórico temporários, para não afetar os do usuário
+        os.environ['EXTRACAO_CACHE_DIR'] = os.path.join(directory, 'cache')
+        os.environ['EXTRACAO_BANCO'] = os.path.join(directory, 'historico.sqlite3')
+        files = {}
+        for report_type in PAGES:
+            folder = os.path.join(directory, report_type)
+            os.makedirs(folder)
+            files[report_type] = write_batch(folder, report_type, args.arquivos)
+
+        print(f"{'sessões':>7} {'p50 ms':>8} {'p95 ms':>8} {'máx ms':>8} {'lote p50 s':>10} "
+              f"{'lote máx s':>10} {'RSS MB':>8} {'erros':>6}")
+        results = []
+        for count in args.sessoes:
+            result = run_level(count, files, args.workers, args.timeout)
+            results.append(result)
+            print(f"{count:>7} {_format(result['latencia_p50_ms'], '8.1f')} "
+                  f"{_format(result['latencia_p95_ms'], '8.1f')} "
+                  f"{_format(result['latencia_max_ms'], '8.1f')} "
+                  f"{_format(result['lote_p50_s'], '10.2f')} "
+                  f"{_format(result['lote_max_s'], '10.2f')} "
+                  f"{result['rss_pico_mb']:8.1f} {result['taxa_erros']:6.1%}")
+            for message in result['mensagens_erro']:
+                print(f"{'':>7} {message}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
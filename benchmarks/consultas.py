@@ -0,0 +1,111 @@
+"""
+Benchmark do histórico de resultados (SQLite) com linhas sintéticas.
+
+Grava `--linhas` linhas de relatórios químicos em um banco temporário, em
+lotes como os de `lote.process_directory`, e mede o tempo de inserção e de
+consultas típicas da página Histórico (empresa, agente, número do relatório,
+período e combinações):
+
+    python benchmarks/consultas.py --linhas 300000
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import historico  # noqa: E402
+import lote  # noqa: E402
+
+AGENTS = ['Benzeno', 'Tolueno', 'Xileno', 'Formaldeído', 'Acetona', 'Etanol',
+          'Hexano', 'Estireno', 'Tricloroetileno', 'Metanol']
+ROWS_PER_FILE = 5
+FILES_PER_RUN = 2000
+
+
+def _rows(report, count, seed=0):
+    rng = random.Random(seed)
+    text = len(report.text_headers) - 2
+    for index in range(count):
+        file_index = index // ROWS_PER_FILE
+        row = [f"Empresa {file_index % 400:03d}", f"AM-{file_index % 5000:05d}",
+               "NIOSH 1501", f"{file_index}-24", rng.choice(AGENTS), 'ppm',
+               f"{rng.uniform(0, 50):.2f}".replace('.', ','), '5,60', '-', '8,69', '32,43', '-']
+        yield row[:text] + [f"r{file_index:06d}.pdf", 'Concluído']
+
+
+def _fill(report, path, count):
+    """
+    Grava as linhas em execuções de FILES_PER_RUN arquivos, cada uma com sua
+    data de processamento, e devolve o tempo total de inserção.
+    """
+    rows = list(_rows(report, count))
+    elapsed = 0.0
+    per_run = FILES_PER_RUN * ROWS_PER_FILE
+    first_day = datetime.datetime(2025, 1, 1)
+    for run, position in enumerate(range(0, count, per_run)):
+        block = report.normalized_rows(rows[position:position + per_run])
+        start = time.perf_counter()
+        writer = historico.HistoryWriter(
+            path, report.name, report.headers, report.numeric_columns,
+            report.index_columns, f"/lote/{run}")
+        writer.processed = str(first_day + datetime.timedelta(days=7 * run))
+        with writer:
+            for row in block:
+                writer.append(row)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def _time_query(conn, report, repeat, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total, _ = historico.query(conn, report.name, limit=1000, **kwargs)
+        times.append(time.perf_counter() - start)
+    return total, statistics.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=300000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    report = lote.load_report('quimica')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'historico.sqlite3')
+        elapsed = _fill(report, path, args.linhas)
+        print(f"inserção: {args.linhas} linhas em {elapsed:.2f} s "
+              f"({args.linhas / elapsed:,.0f} linhas/s)")
+
+        queries = {
+            'empresa': {'filters': {'EMPRESA AVALIADA': 'Empresa 123'}},
+            'agente': {'filters': {'AGENTE QUÍMICO': 'Benzeno'}},
+            'número do relatório': {'filters': {'NÚMERO RELATÓRIO': '4321-24'}},
+            'empresa + agente': {'filters': {'EMPRESA AVALIADA': 'Empresa 123',
+                                             'AGENTE QUÍMICO': 'Benzeno'}},
+            'empresa + período': {'filters': {'EMPRESA AVALIADA': 'Empresa 123'},
+                                  'since': datetime.date(2025, 3, 1),
+                                  'until': datetime.date(2025, 6, 30)},
+            'sem filtros': {},
+        }
+        with closing(historico.connect(path)) as conn:
+            for name, kwargs in queries.items():
+                total, median = _time_query(conn, report, args.repeticoes, **kwargs)
+                print(f"{name:<22} {total:>8} resultados  {median:>8.1f} ms")
+            start = time.perf_counter()
+            historico.distinct_values(conn, report.name, 'EMPRESA AVALIADA')
+            print(f"{'opções de empresa':<22} {'':>8}             "
+                  f"{(time.perf_counter() - start) * 1000:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Compara o pico de memória (RSS) da gravação de planilhas em memória
+(`openpyxl.Workbook` + `wb.save` ao final) com o `TabularWriter` em fluxo contínuo.
+
+Cada medição roda em um subprocesso separado para que o pico de um modo não
+contamine o outro:
+
+    python benchmarks/escrita_planilha.py --linhas 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEADERS = ['EMPRESA AVALIADA', 'AMOSTRADOR', 'METODOLOGIA', 'NÚMERO RELATÓRIO',
+           'AGENTE QUÍMICO', 'UNIDADE', 'RESULTADO', 'MP 8h', 'TETO',
+           'TWA', 'STEL', 'CEILING', 'NOME DO ARQUIVO', 'STATUS']
+
+
+def _row(i):
+    return ['Metalúrgica Alfa Ltda', f'AM-{i:05d}', 'NIOSH 1501 - Cromatografia gasosa',
+            f'{i}-24', 'Benzeno', 'ppm', '0,52', '1,00', '-', '2,50', '5,00', '-',
+            f'relatorio_{i:05d}.pdf', 'Concluído']
+
+
+def _write_in_memory(rows, csv_path, excel_path):
+    import csv
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(HEADERS)
+    with open(csv_path, mode='w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(HEADERS)
+        for i in range(rows):
+            ws.append(_row(i))
+            csv_writer.writerow(_row(i))
+    wb.save(excel_path)
+
+
+def _write_streaming(rows, csv_path, excel_path):
+    from saida import TabularWriter
+
+    with TabularWriter(csv_path, excel_path, HEADERS) as writer:
+        for i in range(rows):
+            writer.append(_row(i))
+
+
+MODES = {'memoria': _write_in_memory, 'fluxo': _write_streaming}
+
+
+def _peak_rss_mb():
+    # ru_maxrss é informado em KB no Linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _child(mode, rows):
+    import openpyxl  # noqa: F401  (importado antes da medição base)
+
+    baseline = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        MODES[mode](rows, os.path.join(tmp, 'saida.csv'), os.path.join(tmp, 'saida.xlsx'))
+        elapsed = time.perf_counter() - start
+    print(json.dumps({'modo': mode, 'linhas': rows, 'segundos': round(elapsed, 3),
+                      'pico_rss_mb': round(_peak_rss_mb(), 1),
+                      'pico_rss_acima_base_mb': round(_peak_rss_mb() - baseline, 1)}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados")
+    parser.add_argument('--filho', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.filho:
+        _child(args.filho[0], int(args.filho[1]))
+        return
+
+    results = []
+    for rows in args.linhas:
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--filho', mode, str(rows)],
+                check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            results.append(result)
+            print(f"{rows:>8} linhas  {mode:<8} {result['segundos']:>8.2f} s  "
+                  f"pico RSS {result['pico_rss_mb']:>7.1f} MB "
+                  f"(+{result['pico_rss_acima_base_mb']:.1f} MB)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark de vazão dos extratores com relatórios PDF sintéticos.
+
+Para cada tipo de relatório e tamanho de lote, gera os PDFs em um diretório
+temporário e executa `lote.process_directory` em um subprocesso isolado,
+medindo arquivos por segundo, a latência de extração por arquivo e por etapa
+(ver `instrumentacao`) e o pico de memória (RSS). Os resultados são salvos em JSON para comparação entre versões:
+
+    python benchmarks/extracao.py --tamanhos 1 10 100 1000 10000 --json atual.json
+    python benchmarks/extracao.py --comparar base.json atual.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_sintetico import GENERATORS, write_batch  # noqa: E402
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000]
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss é informado em KB no Linux e em bytes no macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        'media_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(pick(0.50) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+        'p99_ms': round(pick(0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def _child(report_type, directory, workers):
+    """
+    Executa o lote e imprime as medições em JSON (roda em subprocesso).
+    """
+    import lote
+
+    report = lote.load_report(report_type)
+    latencies = []
+
+    def progress(event):
+        if event['evento'] == 'arquivo':
+            latencies.append(event['segundos'])
+
+    start = time.perf_counter()
+    summary = lote.process_directory(report, directory, workers, use_cache=False,
+                                     progress=progress)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'arquivos': summary['arquivos'],
+        'erros': summary['erros'],
+        'linhas': summary['linhas'],
+        'segundos': round(elapsed, 3),
+        'arquivos_por_segundo': round(summary['arquivos'] / elapsed, 2),
+        'etapas': {
+            'extracao_por_arquivo': _percentiles(latencies),
+            'escrita_e_coordenacao_s': round(
+                max(elapsed - sum(latencies) / max(workers, 1), 0.0), 3),
+            'por_etapa': {
+                name: {key: stats[key] for key in ('total_s', 'media_ms', 'p50_ms', 'p95_ms')}
+                for name, stats in summary['perfil']['etapas'].items()
+            },
+        },
+        'pico_rss_mb': round(_peak_rss_mb(), 1),
+        'pico_rss_workers_mb': round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(report_types, sizes, workers):
+    results = []
+    for report_type in report_types:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                write_batch(directory, report_type, size)
+                output = subprocess.run(
+                    [sys.executable, __file__, '--filho', report_type, directory, str(workers)],
+                    check=True, capture_output=True, text=True).stdout
+            result = {'tipo': report_type, 'tamanho': size, 'workers': workers,
+                      **json.loads(output)}
+            results.append(result)
+            latency = result['etapas']['extracao_por_arquivo']
+            print(f"{report_type:<11} {size:>6} arquivos  "
+                  f"{result['arquivos_por_segundo']:>8.1f} arq/s  "
+                  f"p50 {latency['p50_ms']:>7.1f} ms  p95 {latency['p95_ms']:>7.1f} ms  "
+                  f"pico RSS {result['pico_rss_mb']:.1f} MB", flush=True)
+    return {
+        'metadados': {
+            'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'resultados': results,
+    }
+
+
+def compare(base_path, current_path):
+    """
+    Compara dois arquivos de resultados, mostrando a variação de vazão e de p95.
+    """
+    with open(base_path, encoding='utf-8') as f:
+        base = {(r['tipo'], r['tamanho'], r['workers']): r for r in json.load(f)['resultados']}
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)['resultados']
+
+    for result in current:
+        key = (result['tipo'], result['tamanho'], result['workers'])
+        if key not in base:
+            continue
+        old = base[key]
+        speed = result['arquivos_por_segundo'] / old['arquivos_por_segundo'] - 1
+        p95_old = old['etapas']['extracao_por_arquivo']['p95_ms']
+        p95_new = result['etapas']['extracao_por_arquivo']['p95_ms']
+        print(f"{key[0]:<11} {key[1]:>6} arquivos  vazão {speed:+7.1%}  "
+              f"p95 {p95_old:.1f} -> {p95_new:.1f} ms  "
+              f"pico RSS {old['pico_rss_mb']:.1f} -> {result['pico_rss_mb']:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tipos', nargs='+', choices=sorted(GENERATORS),
+                        default=sorted(GENERATORS))
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--json', help="Arquivo onde salvar os resultados")
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'ATUAL'),
+                        help="Compara dois arquivos de resultados em vez de medir")
+    parser.add_argument('--filho', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.filho:
+        _child(args.filho[0], args.filho[1], int(args.filho[2]))
+    elif args.comparar:
+        compare(*args.comparar)
+    else:
+        report = run(args.tipos, args.tamanhos, args.workers)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
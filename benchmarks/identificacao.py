@@ -0,0 +1,53 @@
+"""
+Custo da identificação automática do tipo de relatório em relação à extração.
+
+Para cada tipo, gera relatórios sintéticos e mede, por arquivo, o tempo de
+`classificacao.detect_report_type` e o da extração completa, conferindo que
+todos os arquivos foram identificados corretamente:
+
+    python benchmarks/identificacao.py --arquivos 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lote  # noqa: E402
+from classificacao import detect_report_type  # noqa: E402
+from pdf_sintetico import GENERATORS, write_batch  # noqa: E402
+
+
+def _median_ms(fn, paths):
+    times = []
+    for path in paths:
+        start = time.perf_counter()
+        fn(path)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--arquivos', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    for report_type in sorted(GENERATORS):
+        report = lote.load_report(report_type)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_batch(directory, report_type, args.arquivos)
+            detected = {detect_report_type(path) for path in paths}
+            classify = _median_ms(detect_report_type, paths)
+            extract = _median_ms(report.extract, paths)
+        print(f"{report_type:<11} identificados como {sorted(map(str, detected))}  "
+              f"identificação {classify:6.2f} ms  extração {extract:6.2f} ms  "
+              f"({classify / extract:.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Custo de importação dos módulos do sistema, a partir de `python -X importtime`.
+
+Para cada módulo, importa-o em um interpretador novo (mediana de algumas
+repetições) e mostra o tempo total e as dependências mais pesadas. Com
+`--json`, o resultado é salvo para comparação com versões seguintes
+(`--comparar`):
+
+    python benchmarks/importacao.py --json importacao_1.0.json
+    python benchmarks/importacao.py --comparar importacao_1.0.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Páginas da interface, caminho dos processos de extração e linha de comando
+MODULES = ('quimica', 'dosimetria', 'classificacao', 'componentes', 'tarefas', 'lote',
+           'cli', 'fila')
+# Dependências pesadas, que só devem ser importadas quando usadas
+HEAVY = ('pandas', 'openpyxl', 'tqdm', 'pyarrow', 'pdfplumber', 'streamlit')
+
+
+def import_times(module):
+    """
+    Tempo total (em ms) da importação de `module` e o tempo cumulativo de cada
+    pacote importado por ela, agrupado pelo nome de primeiro nível. Os módulos
+    carregados na inicialização do interpretador (`site` etc.) não entram.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(cumulative) / 1000))
+    # Cada import é listado ao terminar, depois das suas dependências: a árvore
+    # de `module` são as linhas após o último import de primeiro nível anterior
+    start = max((i + 1 for i, (_, depth, _) in enumerate(entries[:-1]) if depth == 0),
+                default=0)
+    packages = {}
+    for name, depth, ms in entries[start:]:
+        top = name.split('.')[0]
+        # O tempo de um pacote é o do seu import mais externo
+        if top not in packages or depth <= packages[top][1]:
+            packages[top] = (ms, depth)
+    return entries[-1][2], {name: ms for name, (ms, _) in packages.items()}
+
+
+def measure(module, repeat):
+    runs = [import_times(module) for _ in range(repeat)]
+    total = statistics.median(total for total, _ in runs)
+    names = set().union(*(packages for _, packages in runs))
+    packages = {name: statistics.median(packages.get(name, 0.0) for _, packages in runs)
+                for name in names}
+    return {'total_ms': round(total, 1),
+            'pesados': sorted(name for name in HEAVY if name in names),
+            'pacotes': {name: round(ms, 1) for name, ms in
+                        sorted(packages.items(), key=lambda item: -item[1])}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modulos', nargs='*', default=MODULES)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5,
+                        help="Dependências mais pesadas mostradas por módulo")
+    parser.add_argument('--json', metavar='ARQUIVO', help="Salva o resultado em JSON")
+    parser.add_argument('--comparar', metavar='ARQUIVO',
+                        help="Compara com um resultado salvo com --json")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    for module in args.modulos:
+        results[module] = result = measure(module, args.repeticoes)
+        line = f"{module:<14} {result['total_ms']:8.1f} ms"
+        if module in baseline:
+            line += f"  ({result['total_ms'] - baseline[module]['total_ms']:+.1f} ms)"
+        heaviest = [(name, ms) for name, ms in result['pacotes'].items() if name != module]
+        print(line + "  " + ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest[:args.top]))
+        if result['pesados']:
+            print(f"{'':<14} dependências pesadas: {', '.join(result['pesados'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Efeito da ordem de processamento no tempo total e no primeiro resultado de um lote.
+
+Gera um lote de relatórios químicos sintéticos de uma página com alguns
+relatórios grandes (tabelas de várias páginas), gravados por último, e o
+processa na ordem do diretório e nas ordens do agendamento por custo
+(`--ordem maiores` e `menores`, ver `agendamento`). Para cada ordem, mostra o
+tempo total, o tempo até o primeiro arquivo concluído e o erro médio das
+estimativas de custo. Uma rodada inicial, não medida, alimenta o modelo de
+custos (temporário) com medições deste computador:
+
+    python benchmarks/ordem_lote.py --arquivos 60 --grandes 3 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_sintetico import relatorio_quimica, write_batch  # noqa: E402
+
+
+def write_large(directory, count, pages):
+    for i in range(count):
+        with open(os.path.join(directory, f"zz_grande_{i:03d}.pdf"), 'wb') as f:
+            f.write(relatorio_quimica(10000 + i, agentes=25 * pages, paginas_tabela=pages))
+
+
+def run(directory, workers, order):
+    import lote
+    return lote.process_directory(lote.load_report('quimica'), directory, workers,
+                                  use_cache=False, formats=('csv',),
+                                  progress=lambda event: None, schedule=order)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--arquivos', type=int, default=60, help="Relatórios de uma página")
+    parser.add_argument('--grandes', type=int, default=3, help="Relatórios grandes")
+    parser.add_argument('--paginas', type=int, default=20,
+                        help="Páginas de cada relatório grande")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Modelo de custos temporário, para não afetar o do usuário
+        os.environ['EXTRACAO_CUSTOS'] = os.path.join(tmp, 'custos.sqlite3')
+        import lote
+        workers = args.workers or lote.default_workers()
+        directory = os.path.join(tmp, 'lote')
+        write_batch(directory, 'quimica', args.arquivos)
+        write_large(directory, args.grandes, args.paginas)
+
+        run(directory, workers, 'maiores')
+        print(f"{args.arquivos} + {args.grandes} arquivos ({args.paginas} páginas), "
+              f"{workers} processos")
+        print(f"{'ordem':<10} {'total s':>8} {'1º resultado s':>15} {'erro médio ms':>14}")
+        for order in (None, 'maiores', 'menores'):
+            summary = run(directory, workers, order)
+            schedule = summary.get('agendamento') or {}
+            error = schedule.get('erro_medio_segundos')
+            print(f"{order or 'diretório':<10} {summary['segundos']:8.2f} "
+                  f"{summary['primeiro_resultado_segundos']:15.3f} "
+                  f"{error * 1000 if error is not None else float('nan'):14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Gerador de relatórios PDF sintéticos (química e dosimetria) sem dependências externas.
+
+Os relatórios contêm os campos procurados pelas especificações `FIELDS` de
+`quimica.py` e `dosimetria.py` e, no caso da química, a tabela de resultados
+com bordas, de modo que todo o caminho de extração é exercitado.
+"""
+import os
+import random
+import zlib
+
+
+def _escape(texto):
+    return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _pdf(paginas):
+    """
+    Monta um PDF mínimo com uma fonte Helvetica (WinAnsi) e uma página por stream.
+    """
+    objetos = []
+
+    def add(corpo):
+        objetos.append(corpo)
+        return len(objetos)
+
+    fonte = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                b"/Encoding /WinAnsiEncoding >>")
+    pages_id = len(objetos) + 1 + 2 * len(paginas)
+    kids = []
+    for conteudo in paginas:
+        dados = zlib.compress(conteudo.encode('cp1252'))
+        stream = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(dados)
+                     + dados + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, fonte, stream)))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    catalogo = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    saida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, corpo in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        saida += b"%d 0 obj\n" % i + corpo + b"\nendobj\n"
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for off in offsets:
+        saida += b"%010d 00000 n \n" % off
+    saida += (b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objetos) + 1, catalogo, xref))
+    return bytes(saida)
+
+
+def _texto(x, y, texto, tamanho=9):
+    return f"BT /F1 {tamanho} Tf {x} {y} Td ({_escape(texto)}) Tj ET\n"
+
+
+def _tabela(x, y, larguras, linhas, altura=16):
+    """
+    Desenha uma tabela com bordas (detectável pela estratégia 'lines' do pdfplumber).
+    """
+    conteudo = "0.5 w\n"
+    largura_total = sum(larguras)
+    for i in range(len(linhas) + 1):
+        conteudo += f"{x} {y - i * altura} m {x + largura_total} {y - i * altura} l S\n"
+    cx = x
+    for largura in larguras + [0]:
+        conteudo += f"{cx} {y} m {cx} {y - len(linhas) * altura} l S\n"
+        cx += largura
+    for i, linha in enumerate(linhas):
+        cx = x
+        for largura, celula in zip(larguras, linha):
+            conteudo += _texto(cx + 3, y - (i + 1) * altura + 5, celula, 7)
+            cx += largura
+    return conteudo
+
+
+AGENTES = ['Benzeno', 'Tolueno', 'Xileno', 'Etilbenzeno', 'Acetona',
+           'Hexano', 'Formaldeído', 'Estireno', 'Metanol', 'Tricloroetileno']
+EMPRESAS = ['Metalúrgica Alfa Ltda', 'Química Beta S.A.', 'Têxtil Gama Ltda',
+            'Indústria Delta S.A.', 'Petroquímica Épsilon Ltda']
+
+
+def _valor(rng, minimo, maximo):
+    return f"{rng.uniform(minimo, maximo):.2f}".replace('.', ',')
+
+
+def relatorio_quimica(indice=0, agentes=5, paginas_tabela=1, semente=None, rodape=False):
+    """
+    Gera os bytes de um relatório de análise química sintético. Com `rodape`,
+    cada página termina com "Página N de M".
+    """
+    rng = random.Random(indice if semente is None else semente)
+    empresa = rng.choice(EMPRESAS)
+    cabecalho = ['Agente Químico', 'Unidade', 'Resultado', 'MP 8h', 'Teto',
+                 'TWA', 'STEL', 'Ceiling', 'LD']
+    larguras = [110, 45, 55, 50, 40, 50, 50, 50, 50]
+    linhas = [
+        [rng.choice(AGENTES), rng.choice(['ppm', 'mg/m³']), _valor(rng, 0, 5),
+         _valor(rng, 1, 10), '-', _valor(rng, 1, 20), _valor(rng, 5, 40), '-',
+         _valor(rng, 0, 0.1)]
+        for _ in range(agentes)
+    ]
+    conteudo = (
+        _texto(40, 800, f"Relatório de Análise - Nº {1000 + indice}-24", 12)
+        + _texto(40, 775, f"Empresa avaliada: {empresa}")
+        + _texto(40, 760, f"Nº do Amostrador: AM-{indice:05d}")
+        + _texto(40, 745, "Data da coleta: 12/03/2024")
+        + _texto(40, 725, "3 - MÉTODO (s)")
+        + _texto(40, 712, "NIOSH 1501 - Cromatografia gasosa")
+        + _texto(40, 699, "4 - RESULTADOS")
+    )
+    por_pagina = -(-len(linhas) // paginas_tabela)
+    paginas = []
+    for p in range(paginas_tabela):
+        bloco = linhas[p * por_pagina:(p + 1) * por_pagina]
+        topo = 680 if p == 0 else 800
+        conteudo += _tabela(40, topo, larguras, ([cabecalho] if p == 0 else []) + bloco)
+        if p == paginas_tabela - 1:
+            conteudo += _texto(40, 80, "Responsável técnico: Química Responsável - CRQ 0000")
+        if rodape:
+            conteudo += _texto(480, 30, f"Página {p + 1} de {paginas_tabela}", 8)
+        paginas.append(conteudo)
+        conteudo = ""
+    return _pdf(paginas)
+
+
+def relatorio_dosimetria(indice=0, semente=None, colunas=False):
+    """
+    Gera os bytes de um relatório de dosimetria de ruído sintético.
+
+    Com `colunas`, rótulos e valores são escritos separadamente, em duas
+    colunas e em alturas ligeiramente diferentes, e a página traz também o
+    registro horário das medições, como nos relatórios dos dosímetros.
+    """
+    rng = random.Random(indice if semente is None else semente)
+    campos = [
+        ("Razão Social:", rng.choice(EMPRESAS)),
+        ("Nome do Avaliado:", f"Trabalhador {indice:05d}"),
+        ("Cargo:", rng.choice(['Operador', 'Soldador', 'Mecânico', 'Auxiliar'])),
+        ("Incremento de Duplicação Dose:", "5"),
+        ("Utilização da DOSE ou DOSE Projetada:", "DOSE Projetada"),
+        ("DOSE:", f"{_valor(rng, 10, 150)}%"),
+        ("DOSE Projetada:", f"{_valor(rng, 10, 150)}%"),
+        ("Nível de Exposição Normalizada (NEN):", f"{_valor(rng, 70, 95)} dB(A)"),
+    ]
+    titulo = "RELATÓRIO DE DOSIMETRIA DE RUÍDO"
+    if not colunas:
+        linhas = [titulo] + [f"{rotulo} {valor}" for rotulo, valor in campos]
+        conteudo = "".join(_texto(40, 800 - 16 * i, linha, 12 if i == 0 else 9)
+                           for i, linha in enumerate(linhas))
+        return _pdf([conteudo])
+
+    conteudo = _texto(40, 810, titulo, 12)
+    for i, (rotulo, valor) in enumerate(campos):
+        conteudo += _texto(40, 786 - 14 * i, rotulo, 9)
+        conteudo += _texto(230, 786.5 - 14 * i, valor, 10)
+    for hora in range(24):
+        conteudo += _texto(40, 640 - 12 * hora,
+                           f"{hora:02d}:00   Leq {_valor(rng, 60, 95)} dB(A)   "
+                           f"Pico {_valor(rng, 90, 130)} dB(C)", 8)
+        conteudo += _texto(330, 640 - 12 * hora, f"Dose parcial {_valor(rng, 0, 10)}%", 8)
+    return _pdf([conteudo])
+
+
+GENERATORS = {
+    'quimica': relatorio_quimica,
+    'dosimetria': relatorio_dosimetria,
+}
+
+
+def write_batch(directory, report_type, count, start=0, **options):
+    """
+    Grava `count` relatórios sintéticos do tipo `report_type` em `directory`
+    (`options` são repassadas ao gerador).
+    """
+    os.makedirs(directory, exist_ok=True)
+    generate = GENERATORS[report_type]
+    paths = []
+    for i in range(start, start + count):
+        path = os.path.join(directory, f"{report_type}_{i:06d}.pdf")
+        with open(path, 'wb') as f:
+            f.write(generate(i, **options))
+        paths.append(path)
+    return paths
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'EXTRACAO_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'extracao_relatorios'))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(source):
+    """
+    Calcula o SHA-256 do conteúdo de um PDF (caminho, bytes ou arquivo em memória).
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif hasattr(source, 'getbuffer'):
+        digest.update(source.getbuffer())
+    elif hasattr(source, 'read'):
+        position = source.tell()
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(position)
+    else:
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entries(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.pkl'):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+
+def cache_size(extractor=None, directory=None):
+    """
+    Tamanho total (em bytes) ocupado pelo cache inteiro ou pelas entradas de um extrator.
+    """
+    directory = directory or DEFAULT_CACHE_DIR
+    target = os.path.join(directory, extractor) if extractor else directory
+    return sum(size for _, size, _ in _entries(target))
+
+
+class ExtractionCache:
+    """
+    Cache persistente em disco dos resultados de extração.
+
+    A chave combina o hash do conteúdo do PDF com o nome e a versão do extrator,
+    de modo que arquivos renomeados continuam sendo reaproveitados e qualquer
+    mudança na versão do extrator invalida os resultados antigos. Quando o
+    tamanho total ultrapassa `max_bytes`, as entradas usadas há mais tempo são
+    removidas.
+    """
+
+    def __init__(self, extractor, version, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.extractor = extractor
+        self.version = version
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def key(self, source):
+        return content_hash(source)
+
+    def _path(self, key):
+        return os.path.join(self.directory, self.extractor, f"v{self.version}",
+                            key[:2], f"{key}.pkl")
+
+    def get(self, key):
+        """
+        Devolve o resultado armazenado para `key` ou None se não houver.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        size = self.size()
+        try:
+            # A entrada substituída deixa de ocupar espaço
+            size -= os.path.getsize(path)
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._size = size + os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def size(self):
+        """
+        Tamanho total (em bytes) ocupado pelo cache.
+        """
+        if self._size is None:
+            self._size = cache_size(directory=self.directory)
+        return self._size
+
+    def evict(self):
+        """
+        Remove as entradas menos usadas até o cache ocupar 90% de `max_bytes`.
+        """
+        entries = sorted(_entries(self.directory), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def stats(self):
+        return {'acertos': self.hits, 'falhas': self.misses}
+
+
+def invalidate(extractor=None, directory=None):
+    """
+    Apaga o cache inteiro ou apenas as entradas de um extrator.
+    """
+    directory = directory or DEFAULT_CACHE_DIR
+    target = os.path.join(directory, extractor) if extractor else directory
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerencia o cache de extração de PDFs.")
+    parser.add_argument('comando', choices=['limpar', 'tamanho'])
+    parser.add_argument('--extrator', choices=['quimica', 'dosimetria', 'auto'],
+                        help="Limita o comando às entradas de um extrator ('auto': lotes mistos)")
+    parser.add_argument('--diretorio', default=DEFAULT_CACHE_DIR,
+                        help="Diretório do cache (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.comando == 'limpar':
+        invalidate(args.extrator, args.diretorio)
+        print(f"Cache removido: {os.path.join(args.diretorio, args.extrator or '')}")
+    else:
+        size = cache_size(args.extrator, args.diretorio)
+        print(f"{size / (1024 * 1024):.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
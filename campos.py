@@ -0,0 +1,171 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from fontes import display_name
+from instrumentacao import stage
+from texto import DEFAULT_BACKEND, PDFPLUMBER, open_text
+
+_CAPTURE_GROUP = re.compile(r'(?<!\\)\((?!\?)')
+
+
+def text(value):
+    return value.strip()
+
+
+def integer(value):
+    return int(value.strip())
+
+
+class MissingFieldError(ValueError):
+    """
+    Um campo obrigatório não foi encontrado no texto do relatório.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        super().__init__(
+            "campo obrigatório não encontrado: " + ", ".join(self.names))
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    Declaração de um campo do relatório.
+
+    `pattern` é uma expressão regular com exatamente um grupo de captura, que
+    delimita o valor; `parse` converte o texto capturado no tipo do campo.
+    """
+    name: str
+    pattern: str
+    parse: Callable[[str], object] = text
+    required: bool = False
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """
+    Declaração da tabela de resultados: nomes das colunas e o padrão que uma
+    linha precisa conter para ser considerada uma linha de dados.
+    """
+    columns: Sequence[str]
+    row_pattern: str
+
+
+class ReportSpec:
+    """
+    Conjunto de campos de um tipo de relatório, compilado em um único padrão.
+
+    Todos os campos são procurados em uma só varredura do texto: o padrão
+    combinado indica as posições onde algum campo começa e, nessas posições,
+    cada campo ainda não encontrado é testado individualmente. O resultado é o
+    mesmo de aplicar `re.search` campo a campo, mas o texto é percorrido uma
+    única vez e a varredura termina assim que todos os campos são encontrados.
+    """
+
+    def __init__(self, fields, table: Optional[TableSpec] = None):
+        self.fields = list(fields)
+        self.table = table
+        self.required = [field.name for field in self.fields if field.required]
+        self._patterns = [re.compile(field.pattern) for field in self.fields]
+        for field, pattern in zip(self.fields, self._patterns):
+            if pattern.groups != 1:
+                raise ValueError(
+                    f"O padrão do campo '{field.name}' deve ter exatamente um grupo de captura")
+        self._combined = re.compile('|'.join(
+            f"(?={_CAPTURE_GROUP.sub('(?:', field.pattern)})" for field in self.fields))
+        self._row_pattern = re.compile(table.row_pattern) if table else None
+
+    def search(self, text, values=None):
+        """
+        Procura todos os campos em `text`. Campos ausentes ficam como None.
+
+        Com `values` (por exemplo, o resultado da busca em uma página anterior),
+        só os campos ainda None são procurados; o dicionário é completado e
+        devolvido, mantendo os valores já encontrados.
+        """
+        if values is None:
+            values = {field.name: None for field in self.fields}
+        pending = [(field, pattern) for field, pattern in zip(self.fields, self._patterns)
+                   if values.get(field.name) is None]
+        if not pending:
+            return values
+        for position in self._combined.finditer(text):
+            still_pending = []
+            for field, pattern in pending:
+                match = pattern.match(text, position.start())
+                if match:
+                    values[field.name] = field.parse(match.group(1))
+                else:
+                    still_pending.append((field, pattern))
+            pending = still_pending
+            if not pending:
+                break
+        return values
+
+    def missing(self, values):
+        return [name for name in self.required if values.get(name) is None]
+
+    def complete(self, values):
+        """
+        Indica se todos os campos, obrigatórios ou não, foram encontrados.
+        """
+        return all(values.get(field.name) is not None for field in self.fields)
+
+    def row(self, values):
+        """
+        Valores dos campos na ordem de `fields`, com 'N/A' para os ausentes.
+        """
+        return [values.get(field.name) or 'N/A' for field in self.fields]
+
+    def table_rows(self, rows):
+        """
+        Filtra e normaliza as linhas de dados de uma tabela extraída do PDF.
+        """
+        width = len(self.table.columns)
+        return [
+            [str(cell).strip() if cell else 'N/A' for cell in row[:width]]
+            for row in rows
+            if self._row_pattern.search(' '.join(map(str, row)))
+        ]
+
+
+def extract_fields(spec, source, backend=DEFAULT_BACKEND, read_page=None):
+    """
+    Lê os campos de `spec` nas páginas de `source` (caminho ou arquivo em
+    memória), uma a uma, até encontrar todos, e falha se algum obrigatório
+    faltar. Devolve os campos com o total de páginas ('paginas') e as páginas
+    lidas ('paginas_lidas').
+
+    Sem `read_page`, o texto das páginas é lido pelo backend `backend` (ver
+    `texto.open_text`). Com `read_page`, cada página do pdfplumber
+    (`page_objects`) é entregue a `read_page(page, values)`, que completa
+    `values` e indica se a leitura pode terminar.
+    """
+    values = {field.name: None for field in spec.fields}
+    pages = {'paginas': 0, 'paginas_lidas': 0}
+    try:
+        with stage('open'):
+            document = open_text(source, backend if read_page is None else PDFPLUMBER)
+        with document:
+            pages['paginas'] = document.page_count
+            if read_page is None:
+                for text in document.pages():
+                    pages['paginas_lidas'] += 1
+                    with stage('regex'):
+                        spec.search(text, values)
+                    if spec.complete(values):
+                        break
+            else:
+                for page in document.page_objects():
+                    pages['paginas_lidas'] += 1
+                    if read_page(page, values):
+                        break
+        missing = spec.missing(values)
+        if missing:
+            raise MissingFieldError(missing)
+
+    except Exception as e:
+        raise Exception(f"Erro ao processar o arquivo {display_name(source)}: {e}")
+
+    return {**values, **pages}
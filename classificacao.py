@@ -0,0 +1,126 @@
+import re
+
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from instrumentacao import stage
+
+# Versão do classificador (entra na chave do cache dos lotes mistos)
+CLASSIFIER_VERSION = 1
+# Caracteres lidos do início da primeira página para identificar o relatório
+SNIFF_CHARS = 200
+
+# Trechos característicos do cabeçalho de cada tipo de relatório; vence o tipo
+# com mais trechos encontrados
+SIGNATURES = {
+    'quimica': [r'Relatório de Análise - Nº', r'Empresa avaliada:', r'Nº do Amostrador:',
+                r'Agente Químico'],
+    'dosimetria': [r'DOSIMETRIA', r'Razão Social:', r'Nome do Avaliado:',
+                   r'Incremento de Duplicação', r'Nível de Exposição Normalizada'],
+    'microbiologia': [r'MICROBIOL[ÓO]GIC', r'UFC', r'Fungos', r'Bactérias'],
+}
+_SIGNATURES = {name: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+               for name, patterns in SIGNATURES.items()}
+
+
+class ClassifiedError(Exception):
+    """
+    Falha na extração de um relatório cujo tipo já foi identificado.
+    """
+
+    def __init__(self, report_type, message):
+        super().__init__(report_type, message)
+        self.report_type = report_type
+
+    def __str__(self):
+        return self.args[1]
+
+
+class _Enough(Exception):
+    pass
+
+
+class _TextSniffer(PDFTextDevice):
+    """
+    Dispositivo do pdfminer que apenas acumula o texto dos operadores de
+    texto, na ordem do conteúdo da página, sem calcular o layout, e
+    interrompe a interpretação ao atingir `limit` caracteres.
+    """
+
+    def __init__(self, rsrcmgr, limit):
+        super().__init__(rsrcmgr)
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        super().render_string(textstate, seq, ncs, graphicstate)
+        self.parts.append('\n')
+        if self.limit is not None and self.size >= self.limit:
+            raise _Enough
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate):
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            text = ''
+        self.parts.append(text)
+        self.size += len(text)
+        # A posição dos caracteres não interessa aqui
+        return 0
+
+
+def sniff_text(source, limit=SNIFF_CHARS):
+    """
+    Texto do início da primeira página de um PDF (caminho ou arquivo em
+    memória): os primeiros `limit` caracteres, na ordem em que aparecem no
+    conteúdo da página, ou a página inteira com `limit=None`.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return sniff_text(f, limit)
+    position = source.tell()
+    try:
+        document = PDFDocument(PDFParser(source))
+        page = next(PDFPage.create_pages(document), None)
+        if page is None:
+            return ''
+        resources = PDFResourceManager()
+        device = _TextSniffer(resources, limit)
+        try:
+            PDFPageInterpreter(resources, device).process_page(page)
+        except _Enough:
+            pass
+        return ''.join(device.parts)
+    finally:
+        source.seek(position)
+
+
+def classify_text(text):
+    """
+    Tipo de relatório cujo cabeçalho mais se parece com `text`, ou None se
+    nenhum tipo (ou mais de um, empatados) for reconhecido.
+    """
+    scores = {name: sum(1 for pattern in patterns if pattern.search(text))
+              for name, patterns in _SIGNATURES.items()}
+    best = max(scores.values())
+    winners = [name for name, score in scores.items() if score == best]
+    return winners[0] if best and len(winners) == 1 else None
+
+
+def detect_report_type(source):
+    """
+    Identifica o tipo de um relatório PDF ('quimica', 'dosimetria' ou
+    'microbiologia') lendo apenas o início da primeira página; a página
+    inteira só é lida quando o início não basta. Devolve None para relatórios
+    não reconhecidos (por exemplo, digitalizados sem texto).
+    """
+    with stage('classify'):
+        report_type = classify_text(sniff_text(source))
+        if report_type is None:
+            report_type = classify_text(sniff_text(source, limit=None))
+    return report_type
@@ -0,0 +1,155 @@
+"""
+Processamento em lote pela linha de comando, sem Streamlit.
+
+Exemplo (agendado no cron de um servidor de arquivos):
+
+    python cli.py quimica /dados/relatorios --formatos csv xlsx --workers 4
+
+O progresso é emitido em JSON lines na saída padrão: um evento 'inicio', um
+evento 'arquivo' por PDF (com status e tempo de extração) e um evento 'fim'
+com o resumo da execução, incluindo os tempos por etapa. Para investigar um
+arquivo lento, `--cprofile` executa a extração de um único PDF sob o cProfile:
+
+    python cli.py quimica /dados/relatorios/lento.pdf --cprofile
+
+Cada PDF é extraído em um processo isolado: um arquivo que passa de
+`--timeout` segundos ou derruba o processo é tentado mais uma vez e, se falhar
+de novo, fica registrado com o erro na coluna STATUS, sem interromper o lote.
+Os processos são substituídos a cada `--reciclar-apos` arquivos ou quando a
+memória passa de `--memoria-max-mb`.
+
+Com `--incremental`, só os PDFs novos ou alterados desde a execução anterior
+são extraídos, e as linhas são acrescentadas às saídas existentes; uma
+execução interrompida continua de onde parou. `--observar` repete o
+processamento incremental periodicamente:
+
+    python cli.py quimica /dados/relatorios --observar 300
+
+Para dividir um lote entre vários computadores, `--fila` grava a fila de
+extração em um arquivo em um diretório compartilhado; cada computador inicia
+seus trabalhadores com `fila.py`, e este comando (o coordenador) grava as
+saídas à medida que os resultados chegam (`--workers` trabalhadores rodam
+também aqui; use 0 para não extrair localmente):
+
+    python cli.py quimica /rede/relatorios --fila /rede/fila.sqlite3 --workers 0
+    python fila.py /rede/fila.sqlite3 --processos 4    # em cada computador
+
+Laboratórios às vezes reenviam o mesmo relatório com outro nome. Com
+`--duplicatas`, a impressão de cada PDF (o número do relatório, ou o avaliado
+e a dose) é lida do início da primeira página e comparada com a dos arquivos
+já processados, em um índice persistente (ver `duplicatas`); os duplicados não
+são extraídos e, com 'marcar', ficam registrados com o status "Duplicado de
+..." ('ignorar' não grava linha nenhuma para eles):
+
+    python cli.py quimica /dados/relatorios --duplicatas marcar
+
+`--ordem maiores` extrai primeiro os PDFs de maior custo estimado (pelo
+tamanho e pelo total de páginas), para que um relatório grande não fique para
+o fim do lote, e `--ordem menores` começa pelos mais rápidos, adiantando os
+primeiros resultados. Nos dois casos as linhas são gravadas à medida que os
+arquivos ficam prontos, e o custo real de cada um ajusta as estimativas das
+execuções seguintes (ver `agendamento`).
+"""
+import argparse
+import json
+import sys
+
+import lote
+from agendamento import ORDERS
+from duplicatas import POLICIES
+from fila import JobQueue
+from instrumentacao import profile_call
+from isolamento import (DEFAULT_MAX_RSS_MB, DEFAULT_MAX_TASKS, DEFAULT_TIMEOUT,
+                        Isolation)
+
+
+def _emit(event):
+    print(json.dumps(event, ensure_ascii=False), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extrai dados dos relatórios PDF de um diretório.")
+    parser.add_argument('tipo', choices=lote.REPORT_TYPES + (lote.AUTO,),
+                        help="Tipo de relatório ('auto' identifica o tipo de cada arquivo)")
+    parser.add_argument('diretorio',
+                        help="Diretório com os arquivos PDF e/ou ZIP, um arquivo ZIP "
+                             "ou, com --cprofile, um PDF")
+    parser.add_argument('--formatos', nargs='+', choices=lote.ALL_FORMATS,
+                        default=list(lote.OUTPUT_FORMATS) + [lote.HISTORY],
+                        help="Formatos de saída; 'sqlite' acrescenta as linhas ao "
+                             "histórico consultável (padrão: %(default)s)")
+    parser.add_argument('--workers', type=int, default=lote.default_workers(),
+                        help="Processos de extração em paralelo (padrão: %(default)s)")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help="Extrai todos os arquivos, ignorando o cache")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="Tempo máximo de extração por arquivo, em segundos; "
+                             "0 desativa o limite (padrão: %(default)s)")
+    parser.add_argument('--reciclar-apos', type=int, default=DEFAULT_MAX_TASKS,
+                        metavar='ARQUIVOS',
+                        help="Substitui cada processo de extração após este número de "
+                             "arquivos; 0 desativa (padrão: %(default)s)")
+    parser.add_argument('--memoria-max-mb', type=float, default=DEFAULT_MAX_RSS_MB,
+                        metavar='MB',
+                        help="Substitui o processo de extração cuja memória passar deste "
+                             "limite; 0 desativa (padrão: %(default)s)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Extrai apenas os PDFs novos ou alterados desde a última "
+                             "execução, acrescentando as linhas às saídas existentes")
+    parser.add_argument('--observar', type=float, metavar='SEGUNDOS',
+                        help="Observa o diretório, processando-o de forma incremental "
+                             "a cada intervalo, até ser interrompido")
+    parser.add_argument('--fila', metavar='ARQUIVO',
+                        help="Distribui a extração por uma fila neste arquivo, em um "
+                             "diretório compartilhado, atendida por `fila.py` em outros "
+                             "computadores")
+    parser.add_argument('--duplicatas', choices=POLICIES,
+                        help="Não extrai relatórios já processados sob outro nome, "
+                             "marcando-os na saída ou ignorando-os")
+    parser.add_argument('--ordem', choices=ORDERS,
+                        help="Extrai os PDFs em ordem de custo estimado, começando pelos "
+                             "maiores ou pelos menores, em vez da ordem do diretório")
+    parser.add_argument('--perfil', metavar='ARQUIVO',
+                        help="Salva em JSON os tempos por etapa e os arquivos mais lentos")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="Executa a extração de um único PDF sob o cProfile")
+    args = parser.parse_args(argv)
+
+    if args.cprofile:
+        report = lote.load_report(args.tipo)
+        _, stats = profile_call(report.extract, args.diretorio)
+        print(stats)
+        return 0
+
+    try:
+        report = lote.load_report(args.tipo)
+        isolation = Isolation(timeout=args.timeout or None,
+                              max_tasks=args.reciclar_apos or None,
+                              max_rss_mb=args.memoria_max_mb or None)
+        if args.observar:
+            try:
+                lote.watch_directory(report, args.diretorio, args.observar, progress=_emit,
+                                     workers=args.workers, use_cache=not args.sem_cache,
+                                     formats=args.formatos, isolation=isolation,
+                                     duplicates=args.duplicatas, schedule=args.ordem)
+            except KeyboardInterrupt:
+                return 0
+        summary = lote.process_directory(
+            report, args.diretorio, args.workers, not args.sem_cache,
+            args.formatos, progress=_emit, isolation=isolation,
+            incremental=args.incremental,
+            queue=JobQueue(args.fila) if args.fila else None,
+            duplicates=args.duplicatas, schedule=args.ordem)
+    except Exception as e:
+        _emit({'evento': 'erro', 'mensagem': str(e)})
+        return 1
+    if args.perfil:
+        with open(args.perfil, 'w', encoding='utf-8') as f:
+            json.dump(summary['perfil'], f, indent=2, ensure_ascii=False)
+    # Em uma execução incremental sem arquivos novos não há o que falhar
+    return 1 if summary['arquivos'] and summary['erros'] == summary['arquivos'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,392 @@
+import json
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import closing
+
+import streamlit as st
+
+import historico
+import lote
+import tarefas
+from agendamento import LARGEST_FIRST, SMALLEST_FIRST
+from cache_extracao import content_hash, invalidate
+from duplicatas import MARK
+from fontes import is_zip, read_zip_pdf, zip_pdf_names
+from instrumentacao import profile_call
+from saida import parquet_bytes
+
+# Quantidade de extrações mantidas na sessão antes de descartar as mais antigas
+SESSION_CACHE_SIZE = 64
+# Intervalo entre as atualizações do painel de uma tarefa em execução
+JOB_POLL_SECONDS = 1.0
+# Linhas exibidas (e exportadas) por consulta ao histórico
+HISTORY_ROWS = 5000
+# Opções de ordem de processamento dos lotes (ver `agendamento`)
+SCHEDULE_OPTIONS = {
+    "Ordem do diretório": None,
+    "Maiores primeiro": LARGEST_FIRST,
+    "Menores primeiro": SMALLEST_FIRST,
+}
+
+# Opções de um processamento em lote escolhidas na página (ver `batch_options`)
+BatchOptions = namedtuple('BatchOptions',
+                          'directory workers parquet history use_cache duplicates schedule')
+
+
+def batch_progress():
+    """
+    Cria uma barra de progresso e devolve o callback de eventos do processamento em lote.
+    """
+    bar = st.progress(0.0, text="Iniciando...")
+
+    def update(event):
+        if event['evento'] == 'arquivo':
+            bar.progress(event['indice'] / event['total'],
+                         text=f"{event['indice']}/{event['total']} - {event['arquivo']}")
+        elif event['evento'] == 'fim':
+            bar.empty()
+
+    return update
+
+
+def choose_schedule(key=None):
+    """
+    Pergunta a ordem de processamento de um lote e devolve o `schedule` de
+    `lote.process_directory`.
+    """
+    label = st.selectbox(
+        "Ordem de processamento",
+        list(SCHEDULE_OPTIONS),
+        key=key,
+        help="Pelo custo estimado de cada PDF (tamanho e páginas): começar pelos maiores "
+             "evita que um relatório grande fique para o fim do lote, e pelos menores "
+             "adianta os primeiros resultados"
+    )
+    return SCHEDULE_OPTIONS[label]
+
+
+def batch_options(report, duplicates_help, parquet=True):
+    """
+    Opções do processamento em lote comuns às páginas de extração: diretório,
+    processos, saídas (Parquet, se `parquet`, e histórico), cache, relatórios
+    duplicados e ordem de processamento. Devolve um BatchOptions.
+    """
+    use_directory = st.checkbox("Selecionar diretório no computador")
+
+    workers = st.number_input(
+        "Processos de extração em paralelo",
+        min_value=1,
+        max_value=lote.default_workers(),
+        value=lote.default_workers(),
+        help="Quantidade de processos usados para extrair os PDFs do diretório"
+    )
+
+    export_parquet = parquet and st.checkbox(
+        "Exportar também em Parquet",
+        help="Dados tipados, particionados por tipo de relatório e empresa"
+    )
+
+    save_history = st.checkbox(
+        "Salvar no histórico",
+        value=True,
+        help="Acrescenta os resultados ao banco consultado na página Histórico"
+    )
+
+    use_cache = st.checkbox(
+        "Reutilizar resultados de arquivos já processados",
+        value=True,
+        help="Arquivos com o mesmo conteúdo não são extraídos novamente"
+    )
+    if st.button("🗑️ Limpar cache de extração"):
+        invalidate(report.name)
+        st.info("Cache de extração removido.")
+
+    detect_duplicates = st.checkbox("Detectar relatórios duplicados", help=duplicates_help)
+
+    schedule = choose_schedule()
+
+    directory = None
+    if use_directory:
+        directory = st.text_input(
+            "Informe o caminho do diretório contendo os PDFs:",
+            help="Digite o caminho completo para a pasta com PDFs (arquivos ZIP "
+                 "nela também são lidos) ou para um arquivo ZIP"
+        )
+
+    return BatchOptions(directory, int(workers), export_parquet, save_history, use_cache,
+                        MARK if detect_duplicates else None, schedule)
+
+
+def start_batch(report, uploaded_files, options):
+    """
+    Agenda em segundo plano o lote dos arquivos enviados ou, sem eles, do
+    diretório de `options` (BatchOptions) e associa a tarefa à página.
+    """
+    try:
+        if uploaded_files:
+            track_job(report, tarefas.submit_uploads(
+                report, uploaded_files, options.workers, options.use_cache, options.parquet,
+                options.history, options.duplicates, options.schedule))
+
+        elif options.directory:
+            formats = (lote.OUTPUT_FORMATS + (lote.PARQUET,) * options.parquet
+                       + (lote.HISTORY,) * options.history)
+            track_job(report, tarefas.submit_directory(
+                report, options.directory, options.workers, options.use_cache, formats,
+                options.duplicates, options.schedule))
+
+        else:
+            st.warning("Selecione arquivos ou um diretório para processar")
+
+    except Exception as e:
+        st.error(f"❌Erro durante o processamento: {e}")
+
+
+def show_batch_summary(summary):
+    """
+    Exibe o resumo devolvido por `lote.process_directory` e guarda o perfil de
+    desempenho na sessão para a página de diagnóstico.
+    """
+    cache_summary = ""
+    if summary['cache'] is not None:
+        cache_summary = (f" \n**Cache**: {summary['cache']['acertos']} reaproveitados, "
+                         f"{summary['cache']['falhas']} extraídos")
+    st.success(f"Processamento concluído! **Tempo total:** "
+               f"{summary['segundos']:.2f} segundos. \n**Arquivos Processados**: "
+               f"{summary['arquivos']}{cache_summary}")
+
+    # Mostrar resumo de arquivos processados
+    st.write(f"**Arquivos Processados**: {summary['arquivos']}")
+    st.write(f"**Arquivos com Erro**: {summary['erros']}")
+    st.write(f"**Tempo de Processamento**: {summary['segundos']:.2f} segundos")
+    st.write(f"**Páginas Lidas**: {summary['paginas']['lidas']} de "
+             f"{summary['paginas']['total']}")
+    if summary.get('primeiro_resultado_segundos') is not None:
+        st.write(f"**Primeiro Resultado**: {summary['primeiro_resultado_segundos']:.2f} segundos")
+    if summary.get('agendamento') and summary['agendamento']['real_segundos']:
+        st.write(f"**Custo Estimado**: {summary['agendamento']['estimado_segundos']:.2f} "
+                 f"segundos (real: {summary['agendamento']['real_segundos']:.2f} segundos)")
+    if 'duplicatas' in summary:
+        st.write(f"**Duplicados**: {summary['duplicatas']['extracoes_evitadas']} arquivos "
+                 f"não extraídos ({summary['duplicatas']['segundos']:.2f} segundos na "
+                 f"verificação)")
+    if 'tipos' in summary:
+        st.write("**Arquivos por Tipo**: " + ", ".join(
+            f"{name}: {count}" for name, count in summary['tipos'].items()))
+        if summary['classificacao']['fracao_extracao'] is not None:
+            st.write(f"**Identificação do Tipo**: {summary['classificacao']['segundos']:.2f} "
+                     f"segundos ({summary['classificacao']['fracao_extracao']:.1%} do tempo "
+                     f"de extração)")
+
+    st.session_state['ultimo_perfil'] = summary['perfil']
+    with st.expander("🩺 Diagnóstico de desempenho"):
+        show_profile(summary['perfil'])
+
+
+def show_profile(profile):
+    """
+    Painel de diagnóstico: tempos por etapa, arquivos mais lentos e exportação em JSON.
+    """
+    if not profile or not profile['etapas']:
+        st.info("Nenhum arquivo foi extraído neste lote (todos vieram do cache).")
+        return
+
+    import pandas as pd
+    stages = pd.DataFrame([
+        {'Etapa': name, 'Arquivos': stats['arquivos'], 'Total (s)': stats['total_s'],
+         'Média (ms)': stats['media_ms'], 'p50 (ms)': stats['p50_ms'],
+         'p95 (ms)': stats['p95_ms'], 'Máx (ms)': stats['max_ms']}
+        for name, stats in profile['etapas'].items()
+    ]).sort_values('Total (s)', ascending=False)
+    st.markdown("**Tempo por etapa**")
+    st.dataframe(stages, hide_index=True)
+    st.bar_chart(stages.set_index('Etapa')['Total (s)'])
+
+    st.markdown("**Arquivos mais lentos**")
+    st.dataframe(pd.DataFrame([
+        {'Arquivo': item['arquivo'], 'Tempo (s)': item['segundos'], **item['etapas']}
+        for item in profile['mais_lentos']
+    ]), hide_index=True)
+
+    st.download_button(
+        label="📥 Exportar diagnóstico (JSON)",
+        data=json.dumps(profile, indent=2, ensure_ascii=False),
+        file_name="diagnostico_extracao.json",
+        mime="application/json"
+    )
+
+
+def choose_pdf(uploaded_file):
+    """
+    Devolve o PDF a extrair de um arquivo enviado. Para um ZIP, o usuário
+    escolhe um dos PDFs contidos nele, que é descompactado apenas na memória.
+    """
+    if not is_zip(uploaded_file.name):
+        return uploaded_file
+    names = zip_pdf_names(uploaded_file)
+    if not names:
+        raise Exception("Nenhum arquivo PDF encontrado no ZIP.")
+    member = st.selectbox("PDF do arquivo ZIP", names)
+    return read_zip_pdf(uploaded_file, member)
+
+
+def extract_upload(report, uploaded_file, capture_profile=False, max_entries=SESSION_CACHE_SIZE):
+    """
+    Extrai os dados de um arquivo enviado, memorizando o resultado na sessão.
+
+    O Streamlit reexecuta o script a cada interação; com a chave formada pelo
+    hash do conteúdo e pela versão do extrator, o PDF só é lido novamente quando
+    os bytes mudam. As `max_entries` extrações usadas há mais tempo são
+    descartadas. Erros também são memorizados e relançados. Devolve
+    (dados, relatório do cProfile ou None).
+    """
+    store = st.session_state.setdefault('extracoes', OrderedDict())
+    key = (report.name, report.version, content_hash(uploaded_file))
+    entry = store.get(key)
+    if entry is None or (capture_profile and entry[2] is None):
+        stats = None
+        try:
+            if capture_profile:
+                data, stats = profile_call(report.extract, uploaded_file)
+            else:
+                data = report.extract(uploaded_file)
+            entry = (data, None, stats)
+        except Exception as e:
+            entry = (None, e, stats)
+        store[key] = entry
+        while len(store) > max_entries:
+            store.popitem(last=False)
+    else:
+        store.move_to_end(key)
+
+    data, error, stats = entry
+    if error is not None:
+        raise error
+    return data, stats if capture_profile else None
+
+
+def track_job(report, job):
+    """
+    Associa a tarefa à página pelo parâmetro da URL, para que a sessão volte a
+    acompanhá-la mesmo depois de a página ser recarregada.
+    """
+    st.query_params[f"tarefa_{report.name}"] = job.id
+
+
+def show_job(report):
+    """
+    Exibe a tarefa em segundo plano associada a esta página, se houver. Enquanto
+    ela estiver em execução, o painel é atualizado periodicamente sem bloquear
+    o restante da página.
+    """
+    job_id = st.query_params.get(f"tarefa_{report.name}")
+    if not job_id:
+        return
+    job = tarefas.get_job(job_id)
+    if job is None:
+        st.warning("Tarefa não encontrada (o servidor pode ter sido reiniciado).")
+    elif job.is_finished:
+        _show_job_result(job)
+    else:
+        _poll_job(job)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _poll_job(job):
+    state = job.snapshot()
+    if job.is_finished:
+        # Atualiza a página inteira uma última vez e encerra a consulta periódica
+        st.rerun()
+
+    total = state['total'] or 1
+    st.progress(state['concluidos'] / total,
+                text=f"{state['status'].capitalize()}: {state['concluidos']}/{state['total']} "
+                     f"- {state['atual'] or state['origem']}")
+    st.caption(f"Erros até agora: {state['erros']} · {state['segundos']:.1f} segundos")
+    _show_live_rows(job.report, state['linhas'])
+
+
+def _show_live_rows(report, rows):
+    if rows:
+        import pandas as pd
+        st.markdown(f"**Últimas linhas extraídas** (até {tarefas.LIVE_ROWS})")
+        st.dataframe(pd.DataFrame(rows, columns=list(report.headers)), hide_index=True)
+
+
+def _show_job_result(job):
+    state = job.snapshot()
+    if state['erro'] is not None:
+        st.error(f"❌Erro durante o processamento: {state['erro']}")
+        return
+
+    show_batch_summary(state['resumo'])
+    if isinstance(state['excel'], dict):
+        for name, excel in state['excel'].items():
+            st.download_button(
+                label=f"📥 Baixar {name} como Excel",
+                data=excel,
+                file_name=f"dados_processados_{name}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        st.success(f"✅ {state['total']} arquivos processados!")
+    elif state['excel'] is not None:
+        st.download_button(
+            label="📥 Baixar como Excel",
+            data=state['excel'],
+            file_name="dados_processados.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        if state['parquet'] is not None:
+            # O arquivo só é gerado quando o botão é clicado
+            table = state['parquet']
+            st.download_button(
+                label="📥 Baixar como Parquet",
+                data=lambda: parquet_bytes(table),
+                file_name="dados_processados.parquet",
+                mime="application/vnd.apache.parquet"
+            )
+        st.success(f"✅ {state['total']} arquivos processados!")
+    else:
+        st.success(f"✅Arquivos processados no diretório: {state['origem']}")
+    _show_live_rows(job.report, state['linhas'])
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _history_options(report_type, column):
+    with closing(historico.connect()) as conn:
+        return historico.distinct_values(conn, report_type, column)
+
+
+def show_history_page():
+    """
+    Consulta ao histórico de resultados (ver `historico`), com filtros pelas
+    colunas indexadas de cada tipo de relatório e pela data de processamento.
+    """
+    report = lote.load_report(st.selectbox(
+        "Tipo de relatório", lote.REPORT_TYPES,
+        format_func={'quimica': "🧪 Análises Químicas", 'dosimetria': "🔊 Dosimetrias"}.get))
+
+    columns = st.columns(len(report.index_columns))
+    filters = {
+        column: box.multiselect(column.capitalize(), _history_options(report.name, column))
+        for column, box in zip(report.index_columns, columns)
+    }
+    period = st.date_input("Período de processamento", value=(), format="DD/MM/YYYY")
+    since, until = (tuple(period) + (None, None))[:2]
+
+    start = time.perf_counter()
+    total, frame = historico.query_report(report, filters, since, until, limit=HISTORY_ROWS)
+    elapsed = time.perf_counter() - start
+    if not total:
+        st.info("Nenhum resultado no histórico para os filtros escolhidos.")
+        return
+
+    st.caption(f"{total} resultados em {elapsed * 1000:.0f} ms"
+               + (f" (exibindo os {HISTORY_ROWS} mais recentes)" if total > HISTORY_ROWS else ""))
+    st.dataframe(frame, hide_index=True)
+    st.download_button(
+        label="📥 Baixar resultados (CSV)",
+        data=lambda: frame.to_csv(index=False).encode('utf-8'),
+        file_name=f"historico_{report.name}.csv",
+        mime="text/csv"
+    )
@@ -1,146 +1,102 @@
-import streamlit as st
-import pdfplumber
-import pandas as pd
-import re
-import os
-import openpyxl
-import csv
-import time
-from tqdm import tqdm
-
-
-def extract_pdf_data(pdf_path):
+from lote import ReportType
+from campos import FieldSpec, ReportSpec, extract_fields, integer
+from duplicatas import normalize as normalize_fingerprint
+from normalizacao import to_number
+from texto import PDFMINER
+
+# Incrementar sempre que a lógica de extração mudar, invalidando o cache
+EXTRACTOR_VERSION = 4
+# Backend de texto (ver `texto`): os campos dependem apenas do texto simples
+TEXT_BACKEND = PDFMINER
+
+FIELDS = ReportSpec([
+    FieldSpec('razao_social', r'Razão Social:\s*([^\n]+)'),
+    FieldSpec('nome_avaliado', r'Nome do Avaliado:\s*([^\n]+)'),
+    FieldSpec('cargo', r'Cargo:\s*([^\n]+)'),
+    FieldSpec('incremento', r'Incremento de Duplicação Dose:\s*(\d+)', parse=integer),
+    FieldSpec('tipo_dose', r'Utilização da DOSE ou DOSE Projetada:\s*([^\n]+)'),
+    FieldSpec('dose', r'DOSE:\s*(\d+(?:,\d+)?%)'),
+    FieldSpec('dose_projetada', r'DOSE Projetada:\s*(\d+(?:,\d+)?%)'),
+    FieldSpec('nen', r'Nível de Exposição Normalizada \(NEN\):\s*(\d+(?:,\d+)?\s*dB\(A\))'),
+])
+
+
+def extract_pdf_data(pdf_path, backend=TEXT_BACKEND):
     """
-    Extrai informações-chave de um relatório de dosimetria em PDF.
+    Extrai informações-chave de um relatório de dosimetria em PDF (caminho ou
+    arquivo em memória), com o texto lido pelo backend `backend`.
     """
-    extracted_data = {
-        'razao_social': None,
-        'nome_avaliado': None,
-        'cargo': None,
-        'incremento': None,
-        'tipo_dose': None,
-        'dose': None,
-        'dose_projetada': None,
-        'nen': None
-    }
-
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            page = pdf.pages[0]
-            text = page.extract_text()
-
-            # Razão Social
-            razao_social_match = re.search(r'Razão Social:\s*([^\n]+)', text)
-            if razao_social_match:
-                extracted_data['razao_social'] = razao_social_match.group(1).strip()
-
-            # Nome do Avaliado
-            nome_avaliado_match = re.search(r'Nome do Avaliado:\s*([^\n]+)', text)
-            if nome_avaliado_match:
-                extracted_data['nome_avaliado'] = nome_avaliado_match.group(1).strip()
-
-            # Cargo
-            cargo_match = re.search(r'Cargo:\s*([^\n]+)', text)
-            if cargo_match:
-                extracted_data['cargo'] = cargo_match.group(1).strip()
-
-            # Incremento de Duplicação de Dose
-            incremento_match = re.search(r'Incremento de Duplicação Dose:\s*(\d+)', text)
-            if incremento_match:
-                extracted_data['incremento'] = incremento_match.group(1).strip()
-
-            # Utilização da Dose
-            utilizacao_dose_match = re.search(r'Utilização da DOSE ou DOSE Projetada:\s*([^\n]+)', text)
-            if utilizacao_dose_match:
-                extracted_data['tipo_dose'] = utilizacao_dose_match.group(1).strip()
-
-            # Dose
-            dose_match = re.search(r'DOSE:\s*(\d+(?:,\d+)?%)', text)
-            if dose_match:
-                extracted_data['dose'] = dose_match.group(1).strip()
-
-            # Dose Projetada
-            dose_projetada_match = re.search(r'DOSE Projetada:\s*(\d+(?:,\d+)?%)', text)
-            if dose_projetada_match:
-                extracted_data['dose_projetada'] = dose_projetada_match.group(1).strip()
-
-            # Nível de Exposição Normalizada (NEN)
-            nen_match = re.search(r'Nível de Exposição Normalizada \(NEN\):\s*(\d+(?:,\d+)?\s*dB\(A\))', text)
-            if nen_match:
-                extracted_data['nen'] = nen_match.group(1).strip()
-
-    except Exception as e:
-        raise Exception(f"Erro ao processar o arquivo {pdf_path}: {e}")
-
-    return extracted_data
-
-
-def process_directory(directory):
-    """
-    Processa todos os PDFs de um diretório e salva os resultados em arquivos Excel e CSV.
-    """
-    pdf_files = [f for f in os.listdir(directory) if f.endswith('.pdf')]
-    if not pdf_files:
-        raise Exception("Nenhum arquivo PDF encontrado no diretório.")
-
-    excel_path = os.path.join(directory, "relatorios_dosimetria.xlsx")
-    csv_path = os.path.join(directory, "relatorios_dosimetria.csv")
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Dados Extraídos"
-    headers = ['RAZÃO SOCIAL', 'NOME AVALIADO', 'CARGO', 'INCREMENTO', 
-               'USO DOSE', 'DOSE', 'DOSE PROJETADA', 'NEN', 'NOME DO ARQUIVO', 'STATUS']
-    ws.append(headers)
-
-    with open(csv_path, mode='w', newline='', encoding='utf-8') as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(headers)
-
-        start_time = time.time()  # Iniciar o cronômetro de tempo
-        total_files = len(pdf_files)
-
-        # Exibir o progresso do processamento com um "spinner"
-        with st.spinner(f"Processando {total_files} arquivos..."):
-            for pdf_file in tqdm(pdf_files, desc="Processando PDFs", position=0, leave=True):
-                full_path = os.path.join(directory, pdf_file)
-                try:
-                    data = extract_pdf_data(full_path)
-                    
-                    row_data = [
-                        data['razao_social'] or 'N/A', 
-                        data['nome_avaliado'] or 'N/A',
-                        data['cargo'] or 'N/A', 
-                        data['incremento'] or 'N/A', 
-                        data['tipo_dose'] or 'N/A',
-                        data['dose'] or 'N/A',
-                        data['dose_projetada'] or 'N/A', 
-                        data['nen'] or 'N/A', 
-                        pdf_file, 
-                        "Concluído"
-                    ]
-                    
-                    ws.append(row_data)
-                    csv_writer.writerow(row_data)
+    return extract_fields(FIELDS, pdf_path, backend)
 
-                except Exception as e:
-                    ws.append(['N/A'] * 7 + [pdf_file, f"Erro: {e}"])
-                    csv_writer.writerow(['N/A'] * 7 + [pdf_file, f"Erro: {e}"])
 
-        # Calcular o tempo total
-        end_time = time.time()
-        total_time = end_time - start_time
-        st.success(f"Processamento concluído! **Tempo total:** {
-                   total_time:.2f} segundos. \n**Arquivos Processados**: {total_files}")
+# Colunas numéricas derivadas dos valores de texto (ver `normalize`)
+NUMERIC_COLUMNS = ['DOSE (%)', 'DOSE PROJETADA (%)', 'NEN (dB(A))', 'RAZÃO DOSE']
 
-        # Mostrar resumo de arquivos processados
-        st.write(f"**Arquivos Processados**: {total_files}")
-        st.write(f"**Tempo de Processamento**: {total_time:.2f} segundos")
+HEADERS = ['RAZÃO SOCIAL', 'NOME AVALIADO', 'CARGO', 'INCREMENTO',
+           'USO DOSE', 'DOSE', 'DOSE PROJETADA', 'NEN'] + NUMERIC_COLUMNS + [
+           'NOME DO ARQUIVO', 'STATUS']
 
-    wb.save(excel_path)
+
+def normalize(frame):
+    """
+    Acrescenta as colunas numéricas a um DataFrame com as colunas de texto de
+    HEADERS: dose, dose projetada e NEN como float e a razão entre a dose
+    utilizada no laudo ("USO DOSE") e o limite de 100%; razões acima de 1
+    indicam exposição acima do limite. Opera sobre a coluna inteira de uma
+    vez, seja um bloco de linhas do lote ou o histórico consolidado.
+    """
+    dose = to_number(frame['DOSE'])
+    projected = to_number(frame['DOSE PROJETADA'])
+    uses_projected = frame['USO DOSE'].astype('string').str.contains('Projetada', na=False)
+    return frame.assign(**{
+        'DOSE (%)': dose,
+        'DOSE PROJETADA (%)': projected,
+        'NEN (dB(A))': to_number(frame['NEN']),
+        'RAZÃO DOSE': projected.where(uses_projected, dose) / 100,
+    })
+
+
+def report_fingerprint(text):
+    """
+    Impressão de um relatório para a detecção de duplicados: empresa,
+    avaliado, doses e NEN, lidos do início da primeira página, ou None se
+    algum deles não estiver no texto.
+    """
+    fields = FIELDS.search(text)
+    return normalize_fingerprint(fields['razao_social'], fields['nome_avaliado'],
+                                 fields['dose'], fields['dose_projetada'], fields['nen'])
+
+
+def result_rows(data, pdf_file):
+    """
+    Converte os dados extraídos de um relatório na linha da planilha de saída,
+    sem as colunas numéricas.
+    """
+    return [FIELDS.row(data) + [pdf_file, "Concluído"]]
+
+
+REPORT = ReportType(
+    name='dosimetria',
+    extract=extract_pdf_data,
+    version=EXTRACTOR_VERSION,
+    headers=HEADERS,
+    rows=result_rows,
+    output_name='relatorios_dosimetria',
+    numeric_columns=NUMERIC_COLUMNS,
+    normalize=normalize,
+    company_column='RAZÃO SOCIAL',
+    index_columns=['RAZÃO SOCIAL', 'NOME AVALIADO', 'CARGO'],
+    fingerprint=report_fingerprint,
+    # Os campos da impressão ocupam quase toda a (curta) primeira página
+    fingerprint_chars=None,
+)
 
 
 def show_dosimetria_page():
+    import pandas as pd
+    import streamlit as st
+    from componentes import batch_options, choose_pdf, extract_upload, show_job, start_batch
+
     st.header("🔊Relatórios de Dosimetrias")
 
     tab1, tab2 = st.tabs(["📄 Arquivo Único", "📁 Processamento em Lote"])
@@ -148,98 +104,52 @@ def show_dosimetria_page():
     with tab1:
         st.markdown("### Extração de Dados - PDF Único")
         uploaded_file = st.file_uploader(
-            "Faça o upload do arquivo PDF",
-            type=["pdf"]
+            "Faça o upload do arquivo PDF (ou de um ZIP com PDFs)",
+            type=["pdf", "zip"]
+        )
+        capture_profile = st.checkbox(
+            "Capturar perfil de execução (cProfile)",
+            help="Mostra onde o tempo de extração deste arquivo é gasto"
         )
 
         if uploaded_file:
             with st.spinner("Processando o arquivo..."):
-                # Salvar arquivo temporário
-                temp_path = "temp_dos.pdf"
-                with open(temp_path, "wb") as f:
-                    f.write(uploaded_file.read())
-
                 try:
-                    # Extrair dados do PDF
-                    extracted_data = extract_pdf_data(temp_path)
+                    # Extrair dados do PDF diretamente da memória
+                    # (memorizado na sessão: só é extraído de novo se o conteúdo mudar)
+                    extracted_data, stats = extract_upload(
+                        REPORT, choose_pdf(uploaded_file), capture_profile)
+                    if stats:
+                        with st.expander("🩺 Perfil de execução (cProfile)"):
+                            st.code(stats)
                     st.success("Dados extraídos com sucesso!")
+                    st.caption(f"Páginas lidas: {extracted_data['paginas_lidas']} de "
+                               f"{extracted_data['paginas']}")
 
                     # Exibir dados extraídos
-                    st.subheader("Tabela Extraída")
-                    if extracted_data["dados_tabela"] is not None:
-                        st.dataframe(extracted_data["dados_tabela"])
-                    else:
-                        st.warning("Nenhuma tabela encontrada no arquivo.")
+                    st.subheader("Dados Extraídos")
+                    st.dataframe(pd.DataFrame([extracted_data]))
 
                 except Exception as e:
                     st.error(f"Erro ao processar o arquivo: {e}")
 
-                finally:
-                    # Remover arquivo temporário
-                    os.remove(temp_path)
-
     with tab2:
         st.markdown("### Processamento em Lote")
 
         uploaded_files = st.file_uploader(
-            "Faça upload de múltiplos arquivos PDF",
+            "Faça upload de múltiplos arquivos PDF ou ZIP",
             accept_multiple_files=True,
-            type=['pdf']
+            type=['pdf', 'zip']
         )
 
-        use_directory = st.checkbox("Selecionar diretório no computador")
-
-        if use_directory:
-            directory = st.text_input(
-                "Informe o caminho do diretório contendo os PDFs:",
-                help="Digite o caminho completo para a pasta com PDFs"
-            )
+        options = batch_options(
+            REPORT,
+            "Relatórios já processados sob outro nome (mesmo avaliado e dose) não são "
+            "extraídos novamente e ficam marcados como duplicados na planilha"
+        )
 
         if st.button("🚀 Iniciar extração dos dados"):
-            with st.spinner("Processando arquivos..."):
-                try:
-                    if uploaded_files:
-                        # Process uploaded files
-                        all_results = []
-                        for uploaded_file in uploaded_files:
-                            temp_path = f"temp_{uploaded_file.name}"
-                            with open(temp_path, "wb") as f:
-                                f.write(uploaded_file.read())
-
-                            extracted_data = extract_pdf_data(temp_path)
-                            if extracted_data["dados_tabela"] is not None:
-                                extracted_data["dados_tabela"]["Arquivo_Origem"] = uploaded_file.name
-                                all_results.append(
-                                    extracted_data["dados_tabela"])
-                            os.remove(temp_path)
-
-                        # Consolidate results
-                        if all_results:
-                            consolidated_df = pd.concat(
-                                all_results, ignore_index=True)
-
-                            st.download_button(
-                                label="📥 Baixar como Excel",
-                                data=consolidated_df.to_excel(index=False),
-                                file_name="dados_processados.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
-
-                            st.success(
-                                f"✅ {len(all_results)} arquivos processados!")
-                        else:
-                            st.warning(
-                                "Nenhuma tabela encontrada nos arquivos")
-
-                    elif use_directory and directory:
-                        # Existing directory processing logic
-                        process_directory(directory)
-                        st.success(
-                            f"✅Arquivos processados no diretório: {directory}")
-
-                    else:
-                        st.warning(
-                            "Selecione arquivos ou um diretório para processar")
+            # O lote é executado em segundo plano; a página acompanha o progresso
+            start_batch(REPORT, uploaded_files, options)
 
-                except Exception as e:
-                    st.error(f"❌Erro durante o processamento: {e}")
+        show_job(REPORT)
@@ -0,0 +1,92 @@
+import datetime
+import os
+import re
+import sqlite3
+import unicodedata
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    'EXTRACAO_DUPLICATAS',
+    os.path.join(os.path.expanduser('~'), '.extracao_relatorios', 'impressoes.sqlite3'))
+# Tratamento dos relatórios duplicados (ver `lote.process_directory`): MARK
+# grava uma linha com o status "Duplicado de ..." e SKIP não grava nada
+MARK = 'marcar'
+SKIP = 'ignorar'
+POLICIES = (MARK, SKIP)
+
+
+class DuplicateReport(Exception):
+    """
+    Relatório com a mesma impressão de outro já processado (`original`).
+    """
+
+    def __init__(self, report_type, original):
+        super().__init__(report_type, original)
+        self.report_type = report_type
+        self.original = original
+
+    def __str__(self):
+        return f"duplicado de {self.original}"
+
+
+def normalize(*values):
+    """
+    Junta valores de campos em uma impressão, sem diferenças de maiúsculas,
+    acentos e espaços. Devolve None se algum valor estiver ausente.
+    """
+    if any(value is None for value in values):
+        return None
+    parts = []
+    for value in values:
+        value = unicodedata.normalize('NFKD', str(value))
+        value = ''.join(char for char in value if not unicodedata.combining(char))
+        parts.append(re.sub(r'\s+', ' ', value).strip().casefold())
+    return '|'.join(parts)
+
+
+class FingerprintIndex:
+    """
+    Índice persistente das impressões dos relatórios já processados (tipo,
+    impressão, diretório e arquivo do primeiro a registrá-la), compartilhado
+    entre os lotes. As impressões registradas durante um lote só são gravadas
+    ao fim dele, de modo que um lote interrompido não marca como duplicados os
+    arquivos que não chegaram às saídas.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_INDEX_PATH
+        self._conn = None
+        self._pending = []
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS impressoes (
+                tipo TEXT, impressao TEXT, diretorio TEXT, arquivo TEXT,
+                registrado_em TEXT, PRIMARY KEY (tipo, impressao))''')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and self._pending:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO impressoes VALUES (?, ?, ?, ?, ?)",
+                        self._pending)
+        finally:
+            self._conn.close()
+        return False
+
+    def owner(self, report_type, fingerprint):
+        """
+        (diretório, arquivo) que registrou a impressão, ou None.
+        """
+        return self._conn.execute(
+            "SELECT diretorio, arquivo FROM impressoes WHERE tipo = ? AND impressao = ?",
+            (report_type, fingerprint)).fetchone()
+
+    def register(self, report_type, fingerprint, directory, file_name):
+        now = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        self._pending.append((report_type, fingerprint, directory, file_name, now))
@@ -0,0 +1,318 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import lote
+from classificacao import ClassifiedError
+from fontes import ZIP_ERRORS, is_zip, list_entries, read_zip_pdf, zip_pdf_names
+from isolamento import Isolation, IsolatedPool
+
+# Duração (em segundos) da reserva de um arquivo por um trabalhador; a reserva
+# é renovada enquanto a extração estiver em andamento
+DEFAULT_LEASE = 60
+# Tentativas por arquivo antes de registrá-lo como erro (trabalhadores que
+# caem no meio de um arquivo contam como tentativa)
+MAX_ATTEMPTS = 3
+# Intervalo entre as consultas à fila enquanto se espera por trabalho ou resultados
+POLL_SECONDS = 0.2
+
+PENDING = 'pendente'
+RUNNING = 'em_execucao'
+DONE = 'concluida'
+FAILED = 'erro'
+
+# Fonte de uma tarefa: um PDF (`member` None) ou um PDF dentro de um ZIP
+QueuedSource = namedtuple('QueuedSource', 'path member name')
+
+
+class RemoteError(Exception):
+    """
+    Erro de extração ocorrido em outro trabalhador (só a mensagem é preservada).
+    """
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Fila de extração em um arquivo SQLite em um diretório compartilhado, sem
+    servidor: um coordenador enfileira os PDFs de um diretório (`enqueue`),
+    trabalhadores em um ou mais computadores reservam os arquivos um a um
+    (`run_worker`), extraem e gravam o resultado na própria fila, e o
+    coordenador os lê na ordem original (`results`) para gravar as saídas.
+
+    Cada reserva vale por `lease` segundos e é renovada enquanto o arquivo
+    está sendo extraído; se um trabalhador cai, a reserva expira e o arquivo
+    volta a ser distribuído, até MAX_ATTEMPTS tentativas. O banco usa o
+    journal padrão do SQLite (e não WAL), que funciona em sistemas de arquivos
+    de rede com travas de arquivo.
+    """
+
+    def __init__(self, path, lease=DEFAULT_LEASE):
+        self.path = path
+        self.lease = lease
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+            CREATE TABLE IF NOT EXISTS tarefas (
+                id INTEGER PRIMARY KEY, caminho TEXT, membro TEXT, nome TEXT,
+                status TEXT, trabalhador TEXT, reserva_ate REAL, tentativas INTEGER,
+                resultado BLOB, erro TEXT, erro_tipo TEXT, segundos REAL, etapas TEXT);
+            CREATE INDEX IF NOT EXISTS tarefas_status ON tarefas (status, id);
+        ''')
+        return conn
+
+    def enqueue(self, report, directory):
+        """
+        Enfileira os PDFs de `directory` (inclusive os de arquivos ZIP) para o
+        tipo de relatório `report` e devolve a quantidade de arquivos. Se a
+        fila contém este mesmo lote (mesmo tipo, diretório e lista de
+        arquivos) ainda não concluído, por exemplo após reiniciar o
+        coordenador, ela é mantida, com os resultados já obtidos. Qualquer
+        outro conteúdo da fila é apagado, inclusive um lote de outro
+        coordenador ainda em andamento: cada lote simultâneo precisa do seu
+        próprio arquivo de fila.
+        """
+        directory = os.path.abspath(directory)
+        tasks = []
+        for entry in list_entries(directory):
+            if is_zip(entry):
+                label = os.path.basename(entry)
+                try:
+                    members = zip_pdf_names(entry)
+                except ZIP_ERRORS:
+                    # ZIP ilegível: uma única tarefa, cuja leitura falha e
+                    # registra o erro com o nome do ZIP
+                    tasks.append((entry, '', label))
+                    continue
+                tasks.extend((entry, member, f"{label}/{member}") for member in members)
+            else:
+                tasks.append((entry, None, os.path.basename(entry)))
+        listing = hashlib.sha256(json.dumps(tasks).encode('utf-8')).hexdigest()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            meta = dict(conn.execute("SELECT chave, valor FROM meta"))
+            if (meta.get('tipo') == report.name and meta.get('diretorio') == directory
+                    and meta.get('arquivos') == listing and self._unfinished(conn)):
+                conn.execute('COMMIT')
+                return len(tasks)
+            conn.execute("DELETE FROM tarefas")
+            conn.execute("DELETE FROM meta")
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [('tipo', report.name), ('diretorio', directory),
+                              ('arquivos', listing)])
+            conn.executemany(
+                "INSERT INTO tarefas (caminho, membro, nome, status, tentativas) "
+                f"VALUES (?, ?, ?, '{PENDING}', 0)", tasks)
+            conn.execute('COMMIT')
+            return len(tasks)
+        finally:
+            conn.close()
+
+    def report(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT valor FROM meta WHERE chave = 'tipo'").fetchone()
+        finally:
+            conn.close()
+        return lote.load_report(row[0]) if row else None
+
+    def _claim(self, conn, worker):
+        """
+        Reserva a próxima tarefa pendente ou com a reserva expirada.
+        """
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            while True:
+                row = conn.execute(
+                    "SELECT id, caminho, membro, nome, tentativas FROM tarefas "
+                    f"WHERE status = '{PENDING}' OR (status = '{RUNNING}' AND reserva_ate < ?) "
+                    "ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                task_id, path, member, name, attempts = row
+                if attempts >= MAX_ATTEMPTS:
+                    conn.execute(
+                        f"UPDATE tarefas SET status = '{FAILED}', erro = ? WHERE id = ?",
+                        (f"o arquivo interrompeu o trabalhador {attempts} vezes", task_id))
+                    continue
+                conn.execute(
+                    f"UPDATE tarefas SET status = '{RUNNING}', trabalhador = ?, "
+                    "reserva_ate = ?, tentativas = tentativas + 1 WHERE id = ?",
+                    (worker, now + self.lease, task_id))
+                conn.execute('COMMIT')
+                return task_id, QueuedSource(path, member, name)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _renew(self, task_id, worker, stop):
+        conn = self._connect()
+        try:
+            while not stop.wait(self.lease / 3):
+                conn.execute(
+                    "UPDATE tarefas SET reserva_ate = ? WHERE id = ? AND trabalhador = ?",
+                    (time.time() + self.lease, task_id, worker))
+        finally:
+            conn.close()
+
+    def _finish(self, conn, task_id, worker, data, error, seconds, stages):
+        # Só grava se a reserva ainda for deste trabalhador
+        conn.execute(
+            "UPDATE tarefas SET status = ?, resultado = ?, erro = ?, erro_tipo = ?, "
+            f"segundos = ?, etapas = ? WHERE id = ? AND trabalhador = ? AND status = '{RUNNING}'",
+            (FAILED if error is not None else DONE,
+             pickle.dumps(data) if error is None else None,
+             str(error) if error is not None else None,
+             getattr(error, 'report_type', None),
+             seconds, json.dumps(stages), task_id, worker))
+
+    def _unfinished(self, conn):
+        return conn.execute(
+            f"SELECT COUNT(*) FROM tarefas WHERE status IN ('{PENDING}', '{RUNNING}')"
+        ).fetchone()[0]
+
+    def run_worker(self, worker=None, isolation=Isolation()):
+        """
+        Extrai arquivos da fila até que todos estejam concluídos e devolve a
+        quantidade extraída por este trabalhador. Cada arquivo é extraído em
+        um processo isolado (ver `isolamento`), com tempo limite.
+        """
+        worker = worker or _worker_id()
+        report = None
+        while report is None:
+            report = self.report()
+            if report is None:
+                time.sleep(POLL_SECONDS)
+        done = 0
+        conn = self._connect()
+        try:
+            with IsolatedPool(1, isolation) as pool:
+                while True:
+                    claimed = self._claim(conn, worker)
+                    if claimed is None:
+                        if not self._unfinished(conn):
+                            return done
+                        time.sleep(POLL_SECONDS)
+                        continue
+                    task_id, source = claimed
+                    stop = threading.Event()
+                    renewal = threading.Thread(target=self._renew, args=(task_id, worker, stop),
+                                               daemon=True)
+                    renewal.start()
+                    try:
+                        pdf = source.path if source.member is None else \
+                            read_zip_pdf(source.path, source.member)
+                        data, error, seconds, stages = pool.submit(
+                            lote.timed_call, report.extract, pdf).result()
+                    except Exception as e:
+                        data, error, seconds, stages = None, e, 0.0, {}
+                    finally:
+                        stop.set()
+                        renewal.join()
+                    self._finish(conn, task_id, worker, data, error, seconds, stages)
+                    done += 1
+        finally:
+            conn.close()
+
+    @contextmanager
+    def local_workers(self, count, isolation=Isolation()):
+        """
+        Mantém `count` trabalhadores locais em processos separados (como se
+        fossem outros computadores) enquanto o bloco é executado. Ao fim do
+        bloco espera que eles terminem; se o bloco falhar, eles são encerrados.
+        """
+        context = multiprocessing.get_context()
+        processes = [context.Process(target=_run_worker, args=(self.path, self.lease, isolation))
+                     for _ in range(count)]
+        for process in processes:
+            process.start()
+        try:
+            yield processes
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join()
+
+    def results(self):
+        """
+        Resultados das tarefas na ordem em que foram enfileiradas, como
+        `lote.ExtractionResult`, à medida que os trabalhadores os concluem.
+        """
+        conn = self._connect()
+        try:
+            for task_id, in conn.execute("SELECT id FROM tarefas ORDER BY id").fetchall():
+                while True:
+                    row = conn.execute(
+                        "SELECT caminho, membro, nome, status, resultado, erro, erro_tipo, "
+                        "segundos, etapas FROM tarefas WHERE id = ?", (task_id,)).fetchone()
+                    if row[3] in (DONE, FAILED):
+                        break
+                    time.sleep(POLL_SECONDS)
+                path, member, name, status, blob, message, error_type, seconds, stages = row
+                source = path if member is None else QueuedSource(path, member, name)
+                error = None
+                if status == FAILED:
+                    error = ClassifiedError(error_type, message) if error_type \
+                        else RemoteError(message)
+                yield lote.ExtractionResult(
+                    source, pickle.loads(blob) if blob is not None else None, error,
+                    seconds or 0.0, False, json.loads(stages) if stages else {})
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            workers, retried = conn.execute(
+                "SELECT COUNT(DISTINCT trabalhador), SUM(tentativas > 1) FROM tarefas"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {'trabalhadores': workers, 'reprocessados': retried or 0}
+
+
+def _run_worker(path, lease, isolation):
+    JobQueue(path, lease).run_worker(isolation=isolation)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Trabalhador de uma fila de extração compartilhada (ver cli.py --fila).")
+    parser.add_argument('fila', help="Arquivo da fila, em um diretório compartilhado")
+    parser.add_argument('--reserva', type=float, default=DEFAULT_LEASE,
+                        help="Duração da reserva de cada arquivo, em segundos "
+                             "(padrão: %(default)s)")
+    parser.add_argument('--processos', type=int, default=1,
+                        help="Trabalhadores a iniciar neste computador (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.fila, args.reserva)
+    if args.processos == 1:
+        print(f"{queue.run_worker()} arquivos extraídos")
+        return
+    with queue.local_workers(args.processos):
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import os
+import zipfile
+import zlib
+from collections import namedtuple
+from io import BytesIO
+
+# PDF de um diretório ainda não lido: `load()` devolve a fonte (caminho ou
+# PdfBuffer) a entregar ao extrator, e `size` é o tamanho descompactado
+PdfEntry = namedtuple('PdfEntry', 'name size load')
+
+# Erros de leitura de um ZIP corrompido (ou que não é um ZIP) ou de um membro dele
+ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, OSError)
+
+
+class PdfBuffer(BytesIO):
+    """
+    PDF em memória com um nome de exibição, como um membro de um arquivo ZIP
+    ("lote.zip/pasta/relatorio.pdf"). Pode ser enviado aos processos de
+    extração e usado como chave do cache como qualquer arquivo em memória.
+    """
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+class UnreadableZip(PdfBuffer):
+    """
+    Um ZIP que não pôde ser aberto, no lugar dos seus PDFs: não é extraído, e
+    o erro de leitura (`error`) fica registrado na saída com o nome do ZIP,
+    sem interromper o lote.
+    """
+
+    def __init__(self, source, error):
+        super().__init__(b'', _zip_label(source))
+        self.error = error
+
+
+def is_pdf(name):
+    return name.lower().endswith('.pdf')
+
+
+def is_zip(name):
+    return name.lower().endswith('.zip')
+
+
+def _zip_pdf_members(archive):
+    return [info for info in archive.infolist()
+            if not info.is_dir() and is_pdf(info.filename)
+            and not info.filename.startswith('__MACOSX/')]
+
+
+def _zip_label(source):
+    return os.path.basename(source if isinstance(source, str) else source.name)
+
+
+def iter_zip_pdfs(source):
+    """
+    Percorre os PDFs de um ZIP (caminho ou arquivo em memória), inclusive os de
+    subpastas, devolvendo um PdfBuffer por membro. Cada membro é descompactado
+    apenas quando solicitado, de modo que o processamento começa no primeiro
+    PDF sem esperar pelos demais e sem gravar nada em disco.
+    """
+    label = _zip_label(source)
+    try:
+        archive = zipfile.ZipFile(source)
+    except ZIP_ERRORS as e:
+        yield UnreadableZip(source, e)
+        return
+    with archive:
+        for info in _zip_pdf_members(archive):
+            try:
+                data = archive.read(info)
+            except ZIP_ERRORS:
+                # Membro corrompido: a extração falha e o erro fica registrado na saída
+                data = b''
+            yield PdfBuffer(data, f"{label}/{info.filename}")
+
+
+def zip_pdf_names(source):
+    """
+    Caminhos dos PDFs de um ZIP, lidos apenas do diretório central do arquivo.
+    """
+    with zipfile.ZipFile(source) as archive:
+        return [info.filename for info in _zip_pdf_members(archive)]
+
+
+def read_zip_pdf(source, member):
+    """
+    Descompacta um único PDF de um ZIP para a memória.
+    """
+    with zipfile.ZipFile(source) as archive:
+        return PdfBuffer(archive.read(member), f"{_zip_label(source)}/{member}")
+
+
+def load_zip_pdf(source, member):
+    """
+    Como `read_zip_pdf`, mas um membro corrompido é devolvido vazio, para que
+    a extração falhe e o erro fique registrado na saída.
+    """
+    try:
+        return read_zip_pdf(source, member)
+    except ZIP_ERRORS:
+        return PdfBuffer(b'', f"{_zip_label(source)}/{member}")
+
+
+def list_entries(path):
+    """
+    Arquivos PDF e ZIP de `path` (um diretório) ou o próprio `path`, se for
+    um arquivo. `path` também pode ser uma lista de arquivos em memória
+    (PdfBuffer de PDFs ou de ZIPs, como os enviados pelo navegador).
+    """
+    if not isinstance(path, str):
+        return list(path)
+    if os.path.isfile(path):
+        return [path]
+    return [os.path.join(path, name) for name in os.listdir(path)
+            if is_pdf(name) or is_zip(name)]
+
+
+def pdf_count(entry):
+    """
+    Quantidade de PDFs de uma entrada de `list_entries`: 1 para um PDF, os PDFs
+    de um ZIP ou 1 para um ZIP ilegível (ver UnreadableZip).
+    """
+    if not is_zip(display_name(entry)):
+        return 1
+    try:
+        return len(zip_pdf_names(entry))
+    except ZIP_ERRORS:
+        return 1
+
+
+def count_pdfs(path):
+    """
+    Quantidade de PDFs que `iter_pdfs(path)` vai devolver.
+    """
+    return sum(pdf_count(entry) for entry in list_entries(path))
+
+
+def iter_pdfs(path):
+    """
+    Fontes de PDF de `path`: um diretório (os PDFs e o conteúdo de cada ZIP
+    nele) ou um único arquivo ZIP. PDFs avulsos são devolvidos como caminhos e
+    os membros de ZIPs como PdfBuffer.
+    """
+    for entry in list_entries(path):
+        if is_zip(display_name(entry)):
+            yield from iter_zip_pdfs(entry)
+        else:
+            yield entry
+
+
+def _size(entry):
+    return os.path.getsize(entry) if isinstance(entry, str) else entry.getbuffer().nbytes
+
+
+def list_pdfs(path):
+    """
+    Os PDFs de `path`, na ordem de `iter_pdfs`, como PdfEntry: o tamanho dos
+    membros de ZIPs vem do diretório central, sem descompactá-los.
+    """
+    entries = []
+    for entry in list_entries(path):
+        if not is_zip(display_name(entry)):
+            entries.append(PdfEntry(display_name(entry), _size(entry),
+                                    lambda entry=entry: entry))
+            continue
+        label = _zip_label(entry)
+        try:
+            archive = zipfile.ZipFile(entry)
+        except ZIP_ERRORS as e:
+            entries.append(PdfEntry(label, _size(entry),
+                                    lambda entry=entry, error=e: UnreadableZip(entry, error)))
+            continue
+        with archive:
+            for info in _zip_pdf_members(archive):
+                entries.append(PdfEntry(
+                    f"{label}/{info.filename}", info.file_size,
+                    lambda entry=entry, member=info.filename: load_zip_pdf(entry, member)))
+    return entries
+
+
+def display_name(source):
+    """
+    Nome de um PDF nas planilhas de saída: o nome do arquivo ou, para membros
+    de ZIP, o caminho dentro do arquivo.
+    """
+    return os.path.basename(source) if isinstance(source, str) else source.name
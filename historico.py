@@ -0,0 +1,199 @@
+import datetime
+import os
+import sqlite3
+from contextlib import closing
+
+DEFAULT_DB_PATH = os.environ.get(
+    'EXTRACAO_BANCO',
+    os.path.join(os.path.expanduser('~'), '.extracao_relatorios', 'historico.sqlite3'))
+# Linhas acumuladas antes de cada inserção em lote
+INSERT_EVERY = 1000
+
+# Colunas acrescentadas a cada linha gravada no histórico
+DIRECTORY_COLUMN = 'diretorio'
+PROCESSED_COLUMN = 'processado_em'
+_FILE_COLUMN = 'NOME DO ARQUIVO'
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def connect(path=None):
+    """
+    Abre o banco do histórico, criando o arquivo se necessário. O modo WAL
+    permite consultar o histórico enquanto um lote grava nele.
+    """
+    path = path or DEFAULT_DB_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def ensure_table(conn, report_type, headers, numeric_columns, index_columns=()):
+    """
+    Cria (ou completa, se o relatório ganhou colunas) a tabela de um tipo de
+    relatório, com um índice para cada coluna de `index_columns`, para a data
+    de processamento e para a origem de cada arquivo.
+    """
+    table = _quote(report_type)
+    columns = [(DIRECTORY_COLUMN, 'TEXT'), (PROCESSED_COLUMN, 'TEXT')] + [
+        (name, 'REAL' if name in numeric_columns else 'TEXT') for name in headers]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, "
+                 + ', '.join(f"{_quote(name)} {kind}" for name, kind in columns) + ')')
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, kind in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(name)} {kind}")
+
+    indexes = [(PROCESSED_COLUMN,), (DIRECTORY_COLUMN, _FILE_COLUMN)]
+    indexes += [(name,) for name in index_columns]
+    for number, index_columns in enumerate(indexes):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'{report_type}_idx{number}')} "
+                     f"ON {table} ({', '.join(map(_quote, index_columns))})")
+    conn.commit()
+
+
+class HistoryWriter:
+    """
+    Grava as linhas de um lote no histórico (SQLite), em inserções de até
+    `insert_every` linhas por transação. Cada linha recebe a origem
+    (`directory`: o caminho do diretório, ou uma função que devolve a origem
+    de cada arquivo pelo nome, como nos envios pelo navegador) e a data e hora
+    do processamento; ao reprocessar um arquivo da mesma origem, as linhas
+    gravadas antes para ele são substituídas, de modo que o histórico não
+    acumula duplicatas.
+    """
+
+    def __init__(self, path, report_type, headers, numeric_columns, index_columns,
+                 directory, insert_every=INSERT_EVERY):
+        self.path = path
+        self.report_type = report_type
+        self.headers = list(headers)
+        self.numeric_columns = numeric_columns
+        self.index_columns = index_columns
+        self.origin = directory if callable(directory) else lambda file_name: directory
+        self.insert_every = insert_every
+        self.processed = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        self._file = self.headers.index(_FILE_COLUMN)
+        self._pending = []
+        self._seen = set()
+        self._conn = None
+        table = _quote(report_type)
+        columns = [DIRECTORY_COLUMN, PROCESSED_COLUMN] + self.headers
+        self._insert = (f"INSERT INTO {table} ({', '.join(map(_quote, columns))}) "
+                        f"VALUES ({', '.join('?' * len(columns))})")
+        self._delete = (f"DELETE FROM {table} WHERE {_quote(DIRECTORY_COLUMN)} = ? "
+                        f"AND {_quote(_FILE_COLUMN)} = ?")
+
+    def __enter__(self):
+        self._conn = connect(self.path)
+        ensure_table(self._conn, self.report_type, self.headers, self.numeric_columns,
+                     self.index_columns)
+        return self
+
+    def append(self, row):
+        self._pending.append(row)
+        if len(self._pending) >= self.insert_every:
+            self._flush()
+
+    def checkpoint(self):
+        """
+        Grava imediatamente as linhas pendentes.
+        """
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        new_files = {row[self._file] for row in self._pending} - self._seen
+        self._seen |= new_files
+        with self._conn:
+            self._conn.executemany(self._delete,
+                                   [(self.origin(name), name) for name in new_files])
+            self._conn.executemany(self._insert,
+                                   [(self.origin(row[self._file]), self.processed, *row)
+                                    for row in self._pending])
+        self._pending = []
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._flush()
+            # Atualiza as estatísticas usadas pelo SQLite para escolher o índice
+            self._conn.execute('PRAGMA optimize')
+        finally:
+            self._conn.close()
+        return False
+
+
+def table_exists(conn, report_type):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (report_type,)).fetchone() is not None
+
+
+def distinct_values(conn, report_type, column):
+    """
+    Valores distintos de uma coluna indexada, em ordem (lidos do índice).
+    """
+    if not table_exists(conn, report_type):
+        return []
+    name = _quote(column)
+    return [row[0] for row in conn.execute(
+        f"SELECT DISTINCT {name} FROM {_quote(report_type)} "
+        f"WHERE {name} IS NOT NULL ORDER BY {name}")]
+
+
+def _where(filters, since, until):
+    clauses, params = [], []
+    for column, values in (filters or {}).items():
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+    if since is not None:
+        clauses.append(f"{_quote(PROCESSED_COLUMN)} >= ?")
+        params.append(str(since))
+    if until is not None:
+        # Datas sem horário incluem o dia inteiro
+        if isinstance(until, datetime.date) and not isinstance(until, datetime.datetime):
+            until = until + datetime.timedelta(days=1)
+            clauses.append(f"{_quote(PROCESSED_COLUMN)} < ?")
+        else:
+            clauses.append(f"{_quote(PROCESSED_COLUMN)} <= ?")
+        params.append(str(until))
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def query(conn, report_type, filters=None, since=None, until=None, limit=1000):
+    """
+    Consulta o histórico de um tipo de relatório, devolvendo (total, DataFrame)
+    com até `limit` linhas, das mais recentes para as mais antigas.
+
+    `filters` associa colunas a um valor ou a uma lista de valores aceitos;
+    `since` e `until` limitam a data de processamento (datas ou datas e horas).
+    """
+    import pandas as pd
+
+    if not table_exists(conn, report_type):
+        return 0, pd.DataFrame()
+    where, params = _where(filters, since, until)
+    table = _quote(report_type)
+    total = conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+    frame = pd.read_sql_query(
+        f"SELECT * FROM {table}{where} ORDER BY id DESC LIMIT ?", conn,
+        params=params + [limit])
+    return total, frame.drop(columns='id')
+
+
+def query_report(report, filters=None, since=None, until=None, limit=1000, path=None):
+    """
+    `query` para um ReportType, abrindo e fechando o banco do histórico.
+    """
+    with closing(connect(path)) as conn:
+        return query(conn, report.name, filters, since, until, limit)
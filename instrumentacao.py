@@ -0,0 +1,144 @@
+import cProfile
+import heapq
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites superiores (em ms) das faixas dos histogramas de tempo por etapa
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """
+    Mede o tempo de uma etapa e o soma à coleta ativa nesta thread, se houver.
+    Fora de `collect()` não há custo além de uma consulta a atributo.
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def collect():
+    """
+    Ativa a coleta de tempos por etapa e devolve o dicionário preenchido por `stage`.
+    """
+    previous = getattr(_local, 'timings', None)
+    timings = {}
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        index = next((i for i, limit in enumerate(BUCKETS_MS) if ms <= limit), len(BUCKETS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile_ms(self, q):
+        """
+        Estimativa do quantil `q`: limite superior da faixa que o contém.
+        """
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else round(self.max * 1000, 3)
+        return 0.0
+
+    def to_dict(self):
+        return {
+            'arquivos': self.count,
+            'total_s': round(self.total, 4),
+            'media_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': self.quantile_ms(0.50),
+            'p95_ms': self.quantile_ms(0.95),
+            'max_ms': round(self.max * 1000, 3),
+            'histograma': {
+                (f"<={limit}ms" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}ms"): count
+                for i, (limit, count) in enumerate(zip(BUCKETS_MS + (None,), self.counts))
+                if count
+            },
+        }
+
+
+class BatchProfile:
+    """
+    Agrega os tempos por etapa de um lote: um histograma por etapa e os
+    `slowest` arquivos mais lentos com o detalhamento de cada um. O consumo de
+    memória não depende do tamanho do lote.
+    """
+
+    def __init__(self, slowest=10):
+        self.stages = {}
+        self.files = Histogram()
+        self.slowest = slowest
+        self._slowest = []
+        self._order = 0
+
+    def add(self, stage_name, seconds):
+        self.stages.setdefault(stage_name, Histogram()).add(seconds)
+
+    def add_file(self, file_name, seconds, stages):
+        self.files.add(seconds)
+        for stage_name, stage_seconds in stages.items():
+            self.add(stage_name, stage_seconds)
+        self._order += 1
+        entry = (seconds, self._order, file_name, dict(stages))
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest_files(self):
+        return [
+            {'arquivo': name, 'segundos': round(seconds, 4),
+             'etapas': {k: round(v, 4) for k, v in stages.items()}}
+            for seconds, _, name, stages in sorted(self._slowest, reverse=True)
+        ]
+
+    def to_dict(self):
+        return {
+            'por_arquivo': self.files.to_dict(),
+            'etapas': {name: hist.to_dict() for name, hist in self.stages.items()},
+            'mais_lentos': self.slowest_files(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+
+def profile_call(fn, *args, limit=30, sort='cumulative'):
+    """
+    Executa `fn(*args)` sob o cProfile e devolve (resultado, relatório em texto).
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+    return result, output.getvalue()
@@ -0,0 +1,315 @@
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Optional
+
+# Tempo máximo (em segundos) para extrair um arquivo
+DEFAULT_TIMEOUT = 120
+# Quantidade de arquivos processados por um worker antes de ser substituído
+DEFAULT_MAX_TASKS = 500
+# Memória residente (em MB) a partir da qual um worker é substituído
+DEFAULT_MAX_RSS_MB = 1024
+
+# Workers ociosos pré-iniciados (ver `prestart`), entregues aos pools que
+# precisam de um novo worker
+_spares = []
+_spares_lock = threading.Lock()
+_spare_limit = 0
+
+
+@dataclass(frozen=True)
+class Isolation:
+    """
+    Política de isolamento da extração: cada arquivo é processado em um worker
+    separado, interrompido se passar de `timeout` segundos e substituído após
+    `max_tasks` arquivos ou quando sua memória passar de `max_rss_mb`. Arquivos
+    que travam o worker ou derrubam o processo são tentados novamente até
+    `retries` vezes. None desativa o limite correspondente.
+    """
+    timeout: Optional[float] = DEFAULT_TIMEOUT
+    max_tasks: Optional[int] = DEFAULT_MAX_TASKS
+    max_rss_mb: Optional[float] = DEFAULT_MAX_RSS_MB
+    retries: int = 1
+
+
+class ExtractionTimeout(TimeoutError):
+    def __init__(self, seconds):
+        super().__init__(f"tempo limite de {seconds:g} s excedido")
+        self.seconds = seconds
+
+
+class WorkerCrashed(RuntimeError):
+    def __init__(self, exitcode):
+        super().__init__(f"o processo de extração terminou inesperadamente (código {exitcode})")
+
+
+def _rss_mb():
+    """
+    Memória residente atual do processo, em MB (pico de uso fora do Linux).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _worker_main(conn, preload=()):
+    for name in preload:
+        importlib.import_module(name)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        try:
+            outcome = (True, fn(*args))
+        except Exception as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome + (_rss_mb(),))
+        except Exception as e:
+            # Resultado ou exceção que não pode ser serializado
+            conn.send((False, RuntimeError(repr(e)), _rss_mb()))
+
+
+class _Worker:
+    def __init__(self, context, preload=()):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, preload),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+        self.task = None
+        self.started = None
+        self.completed = 0
+
+    def send(self, task):
+        self.task = task
+        self.started = time.monotonic()
+        self.conn.send((task.fn, task.args))
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                self.process.kill()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def prestart(count, preload=()):
+    """
+    Inicia até `count` workers ociosos, que importam os módulos de `preload`
+    antes de receber tarefas, e os deixa à disposição dos próximos
+    IsolatedPool: o primeiro lote não espera pela criação dos processos. A
+    partir daí, os workers em bom estado de um pool encerrado voltam a ficar à
+    disposição (até `count`) em vez de serem finalizados.
+    """
+    global _spare_limit
+    context = multiprocessing.get_context()
+    with _spares_lock:
+        _spare_limit = count
+        missing = count - len(_spares)
+    workers = [_Worker(context, preload) for _ in range(max(missing, 0))]
+    with _spares_lock:
+        _spares.extend(workers)
+
+
+def _take_spare():
+    with _spares_lock:
+        while _spares:
+            worker = _spares.pop()
+            if worker.process.is_alive():
+                return worker
+            worker.conn.close()
+    return None
+
+
+def _give_back(worker):
+    with _spares_lock:
+        if len(_spares) < _spare_limit and worker.process.is_alive():
+            _spares.append(worker)
+            return True
+    return False
+
+
+class _Task:
+    """
+    Resultado pendente de uma tarefa do IsolatedPool. Como um Future, mas
+    `result()` conduz o próprio pool até a tarefa terminar.
+    """
+
+    def __init__(self, pool, fn, args):
+        self.pool = pool
+        self.fn = fn
+        self.args = args
+        self.attempts = 0
+        self._done = False
+        self._value = None
+        self._error = None
+
+    def _finish(self, value=None, error=None):
+        self._done = True
+        self._value, self._error = value, error
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        while not self._done:
+            self.pool._pump()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class IsolatedPool:
+    """
+    Conjunto de processos de extração com isolamento de falhas (ver Isolation).
+
+    Ao contrário do ProcessPoolExecutor, um arquivo que trava ou derruba o
+    worker afeta apenas a própria tarefa: o worker é encerrado e substituído,
+    e a tarefa é tentada novamente ou termina com o erro. O pool não usa
+    threads; ele avança sempre que `submit` ou `result()` de uma tarefa é
+    chamado. `stats` conta as substituições, os tempos esgotados, as quedas
+    de processo e as novas tentativas. Os workers pré-iniciados por
+    `prestart` são usados antes de criar novos.
+    """
+
+    def __init__(self, workers=1, isolation=None):
+        self.workers = max(workers, 1)
+        self.isolation = isolation or Isolation()
+        self.stats = {'reciclados': 0, 'tempo_esgotado': 0, 'falhas_processo': 0,
+                      'novas_tentativas': 0}
+        self._context = multiprocessing.get_context()
+        self._workers = []
+        self._queue = deque()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+    def submit(self, fn, *args):
+        task = _Task(self, fn, args)
+        self._queue.append(task)
+        self._dispatch()
+        return task
+
+    def wait_any(self, tasks):
+        """
+        Conduz o pool até que alguma das tarefas `tasks` termine e devolve a
+        primeira delas que estiver concluída.
+        """
+        while True:
+            for task in tasks:
+                if task.done():
+                    return task
+            self._pump()
+
+    def _dispatch(self):
+        while self._queue:
+            worker = next((w for w in self._workers if w.task is None), None)
+            if worker is None:
+                if len(self._workers) >= self.workers:
+                    return
+                worker = _take_spare() or _Worker(self._context)
+                self._workers.append(worker)
+            worker.send(self._queue.popleft())
+
+    def _remove(self, worker, kill=False):
+        self._workers.remove(worker)
+        worker.stop(kill)
+
+    def _fail(self, worker, error):
+        task = worker.task
+        worker.task = None
+        self._remove(worker, kill=True)
+        task.attempts += 1
+        if task.attempts <= self.isolation.retries:
+            self.stats['novas_tentativas'] += 1
+            self._queue.appendleft(task)
+        else:
+            task._finish(error=error)
+
+    def _receive(self, worker):
+        try:
+            ok, value, rss = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join(timeout=1)
+            self.stats['falhas_processo'] += 1
+            self._fail(worker, WorkerCrashed(worker.process.exitcode))
+            return
+        task = worker.task
+        worker.task = None
+        worker.completed += 1
+        if ok:
+            task._finish(value=value)
+        else:
+            task._finish(error=value)
+
+        isolation = self.isolation
+        if ((isolation.max_tasks and worker.completed >= isolation.max_tasks)
+                or (isolation.max_rss_mb and rss >= isolation.max_rss_mb)):
+            self.stats['reciclados'] += 1
+            self._remove(worker)
+
+    def _pump(self):
+        """
+        Espera até que alguma tarefa em execução termine, estoure o tempo
+        limite ou derrube o worker, e despacha as tarefas da fila.
+        """
+        self._dispatch()
+        busy = [w for w in self._workers if w.task is not None]
+        if not busy:
+            return
+        timeout = None
+        if self.isolation.timeout:
+            deadline = min(w.started for w in busy) + self.isolation.timeout
+            timeout = max(deadline - time.monotonic(), 0)
+
+        ready = set(wait([w.conn for w in busy] + [w.process.sentinel for w in busy], timeout))
+        now = time.monotonic()
+        for worker in busy:
+            if worker.conn in ready or worker.process.sentinel in ready:
+                self._receive(worker)
+            elif self.isolation.timeout and now - worker.started >= self.isolation.timeout:
+                self.stats['tempo_esgotado'] += 1
+                self._fail(worker, ExtractionTimeout(self.isolation.timeout))
+        self._dispatch()
+
+    def shutdown(self):
+        for task in self._queue:
+            task._finish(error=RuntimeError("processamento cancelado"))
+        self._queue.clear()
+        for worker in list(self._workers):
+            if worker.task is not None:
+                worker.task._finish(error=RuntimeError("processamento cancelado"))
+            elif _give_back(worker):
+                self._workers.remove(worker)
+                continue
+            self._remove(worker, kill=worker.task is not None)
@@ -0,0 +1,811 @@
+import importlib
+import os
+import time
+from collections import deque, namedtuple
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+from agendamento import CostModel, plan
+from cache_extracao import ExtractionCache
+from classificacao import (CLASSIFIER_VERSION, SNIFF_CHARS, ClassifiedError, classify_text,
+                           detect_report_type, sniff_text)
+from duplicatas import MARK, DuplicateReport, FingerprintIndex
+from fontes import UnreadableZip, count_pdfs, display_name, iter_pdfs, list_pdfs
+from historico import DEFAULT_DB_PATH, HistoryWriter
+from instrumentacao import BatchProfile, collect
+from isolamento import IsolatedPool, Isolation, prestart
+from manifesto import Manifest, manifest_path
+from saida import PartitionedParquetWriter, TabularWriter, csv_to_excel, iter_csv_rows
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tipos de relatório com extração em lote (nome do módulo de cada um)
+REPORT_TYPES = ('quimica', 'dosimetria')
+# Lote misto: o tipo de cada arquivo é identificado automaticamente (ver `classificacao`)
+AUTO = 'auto'
+
+OUTPUT_FORMATS = ('csv', 'xlsx')
+# Formatos opcionais, gerados apenas quando pedidos explicitamente
+PARQUET = 'parquet'
+# Histórico consultável (banco SQLite compartilhado entre os lotes, ver `historico`)
+HISTORY = 'sqlite'
+ALL_FORMATS = OUTPUT_FORMATS + (PARQUET, HISTORY)
+# Subdiretório com os conjuntos de dados Parquet (um por tipo de relatório,
+# particionado por empresa)
+PARQUET_DIR = 'parquet'
+
+# Dependências das saídas, importadas só quando usadas (ou em `warm_up`)
+WARM_UP_MODULES = ('pandas', 'openpyxl', 'tqdm')
+
+# As linhas são normalizadas em blocos de até NORMALIZE_EVERY linhas, ou a cada
+# NORMALIZE_SECONDS segundos, para que as primeiras apareçam logo na saída
+NORMALIZE_EVERY = 500
+NORMALIZE_SECONDS = 0.5
+
+ExtractionResult = namedtuple('ExtractionResult', 'source data error seconds cached stages')
+
+
+@dataclass(frozen=True)
+class ReportType:
+    """
+    Descrição de um tipo de relatório para o processamento em lote.
+
+    `rows` recebe os dados extraídos de um arquivo e o nome do arquivo e
+    devolve as linhas a gravar na saída, com as colunas de texto de `headers`
+    (`text_headers`). As colunas em `numeric_columns` são calculadas depois por
+    `normalize`, que recebe um DataFrame com as linhas de vários arquivos de
+    uma vez e devolve o mesmo DataFrame com as colunas numéricas acrescentadas.
+    `company_column` é a coluna usada para particionar a saída em Parquet e
+    `index_columns`, as colunas indexadas no histórico (ver `historico`).
+    `fingerprint` recebe o texto do início da primeira página e devolve a
+    impressão que identifica o relatório (por exemplo, o seu número), usada
+    para detectar relatórios duplicados antes da extração, ou None se o texto
+    não bastar, e `fingerprint_chars` é a quantidade de caracteres que
+    normalmente basta (None para a primeira página inteira; ver `fingerprint`).
+    """
+    name: str
+    extract: Callable
+    version: int
+    headers: Sequence[str]
+    rows: Callable[[dict, str], list]
+    output_name: str
+    numeric_columns: Sequence[str] = ()
+    normalize: Optional[Callable[['pd.DataFrame'], 'pd.DataFrame']] = None
+    company_column: Optional[str] = None
+    index_columns: Sequence[str] = ()
+    fingerprint: Optional[Callable[[str], Optional[str]]] = None
+    fingerprint_chars: Optional[int] = SNIFF_CHARS
+
+    @property
+    def text_headers(self):
+        return [column for column in self.headers if column not in self.numeric_columns]
+
+    def status_row(self, file_name, status):
+        return ['N/A'] * (len(self.text_headers) - 2) + [file_name, status]
+
+    def error_row(self, file_name, error):
+        return self.status_row(file_name, f"Erro: {error}")
+
+    def normalized_rows(self, rows):
+        """
+        Acrescenta as colunas numéricas a linhas produzidas por `rows` ou
+        `error_row`, devolvendo-as na ordem de `headers`.
+        """
+        if self.normalize is None or not rows:
+            return rows
+        import pandas as pd
+        frame = self.normalize(pd.DataFrame(rows, columns=self.text_headers))
+        frame = frame[list(self.headers)].astype(object)
+        # NaN vira None para que CSV e Excel recebam células vazias
+        return frame.where(frame.notna(), None).to_numpy().tolist()
+
+
+def load_report(name):
+    """
+    Importa o módulo do tipo de relatório `name` e devolve seu ReportType
+    (MIXED para AUTO).
+    """
+    if name == AUTO:
+        return MIXED
+    if name not in REPORT_TYPES:
+        raise ValueError(f"Tipo de relatório desconhecido: {name}")
+    return importlib.import_module(name).REPORT
+
+
+def extract_any(source):
+    """
+    Identifica o tipo do relatório e o extrai com o extrator correspondente,
+    acrescentando aos dados o tipo identificado ('tipo'). Falhas depois da
+    identificação são devolvidas como ClassifiedError, com o tipo.
+    """
+    report_type = detect_report_type(source)
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"relatório de {report_type} sem extração em lote" if report_type
+                         else "tipo de relatório não identificado")
+    try:
+        data = load_report(report_type).extract(source)
+    except Exception as e:
+        raise ClassifiedError(report_type, str(e)) from e
+    data['tipo'] = report_type
+    return data
+
+
+# Lote misto: cada arquivo vai para as saídas do seu tipo; as linhas entregues
+# a `on_rows` resumem cada arquivo com estas colunas
+MIXED = ReportType(
+    name=AUTO,
+    extract=extract_any,
+    version=CLASSIFIER_VERSION,
+    headers=['NOME DO ARQUIVO', 'TIPO', 'STATUS'],
+    rows=None,
+    output_name='relatorios',
+)
+# Saída dos arquivos de um lote misto cujo tipo não foi identificado
+UNIDENTIFIED = ReportType(
+    name='nao_identificado',
+    extract=None,
+    version=0,
+    headers=['NOME DO ARQUIVO', 'STATUS'],
+    rows=None,
+    output_name='relatorios_nao_identificados',
+)
+
+
+def _mixed_version():
+    # Muda quando o classificador ou qualquer um dos extratores muda
+    return '-'.join([str(CLASSIFIER_VERSION)]
+                    + [str(load_report(name).version) for name in REPORT_TYPES])
+
+
+def default_workers():
+    """
+    Número padrão de processos de extração (um por núcleo de CPU disponível).
+    """
+    return os.cpu_count() or 1
+
+
+def warm_up(workers=None):
+    """
+    Prepara o processo para o primeiro lote: importa os módulos de extração e
+    as dependências das saídas e pré-inicia `workers` processos de extração
+    (padrão: `default_workers()`), já com os módulos de extração importados,
+    que ficam à disposição dos lotes seguintes (ver `isolamento.prestart`).
+    """
+    for name in REPORT_TYPES + WARM_UP_MODULES:
+        importlib.import_module(name)
+    prestart(workers or default_workers(), preload=REPORT_TYPES)
+
+
+def fingerprint(report, source):
+    """
+    Impressão de um PDF para a detecção de duplicados: (tipo, impressão),
+    calculada por `ReportType.fingerprint` sobre os primeiros
+    `fingerprint_chars` caracteres da primeira página (ou a página inteira, se
+    eles não bastarem), sem a extração completa. No lote misto, o tipo é
+    identificado pelo mesmo texto. Devolve None se o tipo não tiver impressão
+    ou se ela não puder ser calculada (por exemplo, em PDFs digitalizados ou
+    corrompidos, cujos erros reaparecem na extração).
+    """
+    for limit in (report.fingerprint_chars, None) if report.fingerprint_chars else (None,):
+        try:
+            text = sniff_text(source, limit)
+        except Exception:
+            return None
+        file_report = report
+        if report is MIXED:
+            report_type = classify_text(text)
+            file_report = load_report(report_type) if report_type in REPORT_TYPES else None
+        if file_report is not None and file_report.fingerprint is not None:
+            value = file_report.fingerprint(text)
+            if value is not None:
+                return file_report.name, value
+        if limit is None or len(text) < limit:
+            # A página inteira já foi lida
+            return None
+
+
+def _cache_lookup(cache, source):
+    """
+    Consulta o cache para `source`, devolvendo (chave, dados). Falhas ao ler o
+    arquivo são ignoradas aqui e reaparecem na extração propriamente dita.
+    """
+    if cache is None:
+        return None, None
+    try:
+        key = cache.key(source)
+    except OSError:
+        return None, None
+    return key, cache.get(key)
+
+
+def timed_call(extract_fn, source):
+    """
+    Executa a extração medindo o tempo total e o de cada etapa instrumentada.
+    Erros são devolvidos em vez de propagados para que os tempos também sejam
+    registrados nesses casos.
+    """
+    start = time.perf_counter()
+    with collect() as stages:
+        try:
+            data, error = extract_fn(source), None
+        except Exception as e:
+            data, error = None, e
+    return data, error, time.perf_counter() - start, stages
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _error_seconds(error):
+    return getattr(error, 'seconds', 0.0)
+
+
+def _collect(cache, source, key, future, cached):
+    try:
+        data, error, seconds, stages = future.result()
+    except Exception as e:
+        return ExtractionResult(source, None, e, _error_seconds(e), False, {})
+    if error is None and key is not None:
+        cache.put(key, data)
+    return ExtractionResult(source, data, error, seconds, cached, stages)
+
+
+def _pop_result(pending, executor, ordered):
+    if ordered or executor is None:
+        item = pending.popleft()
+    else:
+        finished = executor.wait_any([item[3] for item in pending])
+        item = next(item for item in pending if item[3] is finished)
+        pending.remove(item)
+    return _collect(*item)
+
+
+def iter_extract(extract_fn, sources, workers=1, max_in_flight=None, cache=None,
+                 isolation=None, pool=None, screen=None, ordered=True):
+    """
+    Aplica `extract_fn` a cada item de `sources`, distribuindo o trabalho entre
+    `workers` processos, e devolve um ExtractionResult por fonte, na ordem original.
+
+    No máximo `max_in_flight` arquivos ficam pendentes ao mesmo tempo (padrão:
+    duas vezes o número de processos), mantendo o uso de memória constante
+    independentemente do tamanho do lote. Com um `cache` (ExtractionCache), os
+    arquivos já processados são devolvidos sem passar pelo extrator.
+
+    Os processos seguem a política `isolation` (ver `isolamento.Isolation`):
+    tempo limite por arquivo, substituição periódica e novas tentativas. Um
+    `pool` (IsolatedPool) já criado pode ser informado para reaproveitar os
+    processos e consultar suas estatísticas. Com um único worker e sem
+    `isolation` nem `pool`, a extração roda no próprio processo.
+
+    `screen`, se informado, é chamado com cada fonte antes do cache e da
+    extração; se devolver uma exceção, a fonte não é extraída e o resultado
+    traz essa exceção como erro. O mesmo vale para os ZIPs ilegíveis
+    (`fontes.UnreadableZip`), que trazem o erro de leitura do arquivo.
+
+    Com `ordered=False`, os resultados são devolvidos à medida que ficam
+    prontos, e não na ordem original: um arquivo demorado não impede que os
+    processos livres recebam os arquivos seguintes.
+    """
+    owns_pool = pool is None and (workers > 1 or isolation is not None)
+    if owns_pool:
+        pool = IsolatedPool(workers, isolation)
+    executor = pool
+    if executor is None:
+        max_in_flight = 1
+    else:
+        max_in_flight = max(max_in_flight or executor.workers * 2, 1)
+
+    try:
+        pending = deque()
+        for source in sources:
+            if isinstance(source, UnreadableZip):
+                rejected = source.error
+            else:
+                rejected = screen(source) if screen is not None else None
+            key, data = (None, None) if rejected is not None else _cache_lookup(cache, source)
+            if rejected is not None:
+                pending.append((None, source, None, _done((None, rejected, 0.0, {})), False))
+            elif data is not None:
+                pending.append((cache, source, None, _done((data, None, 0.0, {})), True))
+            elif executor is None:
+                pending.append((cache, source, key, _done(timed_call(extract_fn, source)), False))
+            else:
+                pending.append((cache, source, key,
+                                executor.submit(timed_call, extract_fn, source), False))
+            if len(pending) >= max_in_flight:
+                yield _pop_result(pending, executor, ordered)
+        while pending:
+            yield _pop_result(pending, executor, ordered)
+    finally:
+        if owns_pool:
+            pool.shutdown()
+
+
+def _page_stats(data):
+    """
+    Total de páginas e páginas lidas informados pelo extrator, quando houver.
+    """
+    if not isinstance(data, dict):
+        return {}
+    return {key: data[key] for key in ('paginas', 'paginas_lidas') if key in data}
+
+
+class _RowBuffer:
+    """
+    Acumula as linhas de vários arquivos para normalizá-las em bloco antes de
+    gravá-las, preservando a ordem dos arquivos. Se `on_flush` for informado,
+    ele recebe os nomes dos arquivos de cada bloco depois de gravado.
+    """
+
+    def __init__(self, report, writers, profile, on_rows=None, on_flush=None):
+        self.report = report
+        self.writers = writers
+        self.profile = profile
+        self.on_rows = on_rows
+        self.on_flush = on_flush
+        self.files = 0
+        self._files = []
+        self._rows = 0
+        self._started = None
+
+    def add(self, file_name, rows):
+        if not self._files:
+            self._started = time.perf_counter()
+        self._files.append((file_name, rows))
+        self.files += 1
+        self._rows += len(rows)
+        if (self._rows >= NORMALIZE_EVERY
+                or time.perf_counter() - self._started >= NORMALIZE_SECONDS):
+            self.flush()
+
+    def flush(self):
+        if not self._files:
+            return
+        start = time.perf_counter()
+        rows = self.report.normalized_rows(
+            [row for _, file_rows in self._files for row in file_rows])
+        self.profile.add('normalize', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        position = 0
+        for file_name, file_rows in self._files:
+            written = rows[position:position + len(file_rows)]
+            position += len(file_rows)
+            for writer in self.writers:
+                for row in written:
+                    writer.append(row)
+            if self.on_rows is not None:
+                self.on_rows(file_name, written)
+        self.profile.add('write', time.perf_counter() - start)
+        if self.on_flush is not None:
+            self.on_flush([file_name for file_name, _ in self._files])
+        self._files = []
+        self._rows = 0
+
+
+class _DuplicateScreen:
+    """
+    Filtro de relatórios duplicados de um lote (o `screen` de `iter_extract`):
+    calcula a impressão de cada PDF (ver `fingerprint`) e devolve um
+    DuplicateReport se ela já apareceu neste lote ou está registrada no
+    `index` para outro arquivo. Reprocessar o mesmo arquivo da mesma origem
+    (`origin`: um rótulo ou uma função da fonte, ver `process_directory`) não
+    é duplicação. A impressão de um
+    arquivo só é registrada depois que ele é extraído com sucesso (`register`).
+    `stats` traz as extrações evitadas e o tempo gasto com as impressões.
+    """
+
+    def __init__(self, report, origin, index):
+        self.report = report
+        self.origin = origin
+        self.index = index
+        self.seconds = 0.0
+        self.avoided = 0
+        self._seen = {}
+        self._pending = {}
+
+    def __call__(self, source):
+        start = time.perf_counter()
+        found = fingerprint(self.report, source)
+        self.seconds += time.perf_counter() - start
+        if found is None:
+            return None
+        name = display_name(source)
+        original = self._seen.setdefault(found, name)
+        if original == name:
+            owner = self.index.owner(*found)
+            origin = self.origin(source) if callable(self.origin) else self.origin
+            if owner is None or owner == (origin, name):
+                self._pending[name] = found, origin
+                return None
+            # O original registrado em outro lote é identificado pelo caminho
+            original = os.path.join(*owner)
+        self.avoided += 1
+        return DuplicateReport(found[0], original)
+
+    def register(self, file_name):
+        pending = self._pending.pop(file_name, None)
+        if pending is not None:
+            found, origin = pending
+            self.index.register(*found, origin, file_name)
+
+    def stats(self):
+        return {'extracoes_evitadas': self.avoided, 'segundos': round(self.seconds, 3)}
+
+
+def _output_dir(directory):
+    # Para um arquivo ZIP, as saídas são gravadas no diretório em que ele está
+    return os.path.dirname(directory) if os.path.isfile(directory) else directory
+
+
+def _open_outputs(stack, report, directory, formats, profile, on_rows, origin, manifest=None,
+                  committed=None):
+    """
+    Abre, em `stack`, os writers de `report` para os formatos pedidos e
+    devolve os caminhos das saídas, o TabularWriter e o _RowBuffer. As linhas
+    do histórico são gravadas com a origem `origin` (ver `HistoryWriter`).
+
+    Com um `manifest` (processamento incremental), o CSV é aberto para
+    acréscimo, depois de descartadas as linhas posteriores ao último ponto
+    registrado, e cada bloco gravado é registrado no manifesto junto com a
+    nova posição do CSV; `committed(nomes)` devolve as entradas a registrar.
+    Excel e Parquet são gerados a partir do CSV ao fim do lote (ver
+    `_export_incremental`).
+    """
+    output_dir = _output_dir(directory)
+    if report is UNIDENTIFIED:
+        formats = [fmt for fmt in formats if fmt in OUTPUT_FORMATS]
+    outputs = {fmt: os.path.join(output_dir, PARQUET_DIR, report.name) if fmt == PARQUET
+               else DEFAULT_DB_PATH if fmt == HISTORY
+               else os.path.join(output_dir, f"{report.output_name}.{fmt}") for fmt in formats}
+    if manifest is None:
+        writer = stack.enter_context(
+            TabularWriter(outputs.get('csv'), outputs.get('xlsx'), report.headers))
+    else:
+        csv_path = outputs['csv']
+        if os.path.exists(csv_path):
+            # Linhas de uma execução interrompida, de arquivos que não foram registrados
+            os.truncate(csv_path, manifest.offset(os.path.basename(csv_path)))
+        writer = stack.enter_context(
+            TabularWriter(csv_path, None, report.headers, append=True))
+    writers = [writer]
+    if PARQUET in outputs and manifest is None:
+        writers.append(stack.enter_context(PartitionedParquetWriter(
+            outputs[PARQUET], report.headers, report.numeric_columns, report.company_column)))
+    if HISTORY in outputs:
+        writers.append(stack.enter_context(HistoryWriter(
+            outputs[HISTORY], report.name, report.headers, report.numeric_columns,
+            report.index_columns, origin)))
+
+    on_flush = None
+    if manifest is not None:
+        def on_flush(file_names):
+            for item in writers[1:]:
+                item.checkpoint()
+            manifest.commit(committed(file_names),
+                            {os.path.basename(outputs['csv']): writer.checkpoint()})
+    return outputs, writer, _RowBuffer(report, writers, profile, on_rows, on_flush)
+
+
+def _export_incremental(report, outputs, manifest, changed):
+    """
+    Atualiza as saídas derivadas do CSV de um processamento incremental: a
+    planilha Excel é gerada de novo a partir do CSV (só se ele mudou, pois o
+    formato não permite acrescentar linhas), e as linhas acrescentadas ao CSV
+    desde a última exportação vão para um novo arquivo Parquet.
+    """
+    csv_path = outputs['csv']
+    if 'xlsx' in outputs and (changed or not os.path.exists(outputs['xlsx'])):
+        csv_to_excel(csv_path, outputs['xlsx'], report.numeric_columns)
+    if PARQUET in outputs:
+        key = f"{PARQUET}:{os.path.basename(csv_path)}"
+        end = os.path.getsize(csv_path)
+        start = manifest.offset(key)
+        if end > start:
+            # Nome derivado da posição inicial no CSV: único para cada exportação
+            # (duas execuções no mesmo segundo não se sobrescrevem) e, se uma
+            # exportação interrompida for refeita, os mesmos arquivos são substituídos
+            part = f"part-{start:012d}"
+            with PartitionedParquetWriter(outputs[PARQUET], report.headers,
+                                          report.numeric_columns, report.company_column,
+                                          replace=False, part_name=part) as writer:
+                for row in iter_csv_rows(csv_path, start, report.numeric_columns):
+                    writer.append(row)
+        manifest.commit(offsets={key: end})
+
+
+# Arquivos de um lote: `sources` (None se vêm de uma fila), `entries` (os
+# PendingFile do manifesto, usados no agendamento), os arquivos inalterados
+# (`skipped`, None fora do modo incremental), as entradas do manifesto a
+# regravar ao fim do lote (`refreshed`) e a função `committed` de `_open_outputs`
+_BatchSources = namedtuple('_BatchSources', 'total sources entries skipped refreshed committed')
+
+
+def _list_sources(stack, report, directory, manifest, queue, statuses, sources=None):
+    """
+    Arquivos do lote conforme o modo: os novos ou alterados segundo o
+    `manifest` (aberto em `stack`), os enfileirados em `queue` ou todos os
+    PDFs de `directory` (ou dos arquivos em memória `sources`). `statuses`
+    associa cada arquivo gravado ao status a registrar no manifesto.
+    """
+    entries, skipped, refreshed, committed = None, None, [], None
+    if manifest is not None:
+        stack.enter_context(manifest)
+        entries, skipped, refreshed = manifest.pending(directory)
+        total, found = len(entries), len(entries) + skipped
+        sources = (item.load() for item in entries)
+        by_name = {item.name: item for item in entries}
+
+        def committed(file_names):
+            return [(name, by_name[name].size, by_name[name].mtime, by_name[name].hash,
+                     statuses.pop(name)) for name in file_names]
+    elif queue is not None:
+        total = found = queue.enqueue(report, directory)
+        sources = None
+    else:
+        inputs = directory if sources is None else sources
+        total = found = count_pdfs(inputs)
+        sources = iter_pdfs(inputs)
+    if not found:
+        raise Exception("Nenhum arquivo PDF encontrado no diretório.")
+    return _BatchSources(total, sources, entries, skipped, refreshed, committed)
+
+
+class _Schedule:
+    """
+    Agendamento de um lote por custo (ver `agendamento`): ordena os PDFs
+    `entries` conforme `order` e registra no `model` o custo real de cada
+    arquivo agendado, acumulando o custo estimado e o real para o resumo.
+    """
+
+    def __init__(self, report, entries, model, order):
+        self.report = report
+        self.model = model
+        self.order = order
+        files, self.seconds = plan(entries, report.name, model, order)
+        self.sources = (item.load() for item in files)
+        self._files = {item.name: item for item in files}
+        self._estimated = self._real = self._error = 0.0
+        self._recorded = 0
+
+    def record(self, file_name, seconds):
+        scheduled = self._files.get(file_name)
+        if scheduled is None:
+            return
+        self.model.record(self.report.name, scheduled, seconds)
+        self._estimated += scheduled.estimate
+        self._real += seconds
+        self._error += abs(scheduled.estimate - seconds)
+        self._recorded += 1
+
+    def stats(self):
+        return {
+            'ordem': self.order,
+            'segundos': round(self.seconds, 3),
+            'estimado_segundos': round(self._estimated, 3),
+            'real_segundos': round(self._real, 3),
+            'erro_medio_segundos': round(self._error / self._recorded, 4)
+            if self._recorded else None,
+        }
+
+
+def _summary(report, directory, batch, opened, seconds, first_result, errors, pages,
+             profile, cache, pool, queue, scheduler, screen, classify):
+    """
+    Resumo do lote, com as seções dos modos usados ('ignorados', 'fila',
+    'agendamento', 'duplicatas' e, no lote misto, 'tipos' e 'classificacao').
+    """
+    mixed = report is MIXED
+    summary = {
+        'evento': 'fim',
+        'tipo': report.name,
+        'diretorio': directory,
+        'arquivos': batch.total,
+        'erros': errors,
+        'linhas': sum(writer.rows_written for _, writer, _ in opened.values()),
+        'segundos': round(seconds, 3),
+        'cache': cache.stats() if cache is not None else None,
+        'paginas': pages,
+        'isolamento': pool.stats if pool is not None else None,
+        'saidas': ({name: paths for name, (paths, _, _) in opened.items()} if mixed
+                   else opened[report.name][0]),
+        'perfil': profile.to_dict(),
+        'primeiro_resultado_segundos':
+            round(first_result, 3) if first_result is not None else None,
+    }
+    if batch.skipped is not None:
+        summary['ignorados'] = batch.skipped
+    if queue is not None:
+        summary['fila'] = queue.stats()
+    if scheduler is not None:
+        summary['agendamento'] = scheduler.stats()
+    if screen is not None:
+        summary['duplicatas'] = screen.stats()
+    if mixed:
+        summary['tipos'] = {name: buffer.files for name, (_, _, buffer) in opened.items()}
+        summary['classificacao'] = {
+            'segundos': round(classify['segundos'], 3),
+            'fracao_extracao': round(classify['segundos'] / classify['extracao_segundos'], 4)
+            if classify['extracao_segundos'] else None,
+        }
+    return summary
+
+
+def process_directory(report, directory, workers=1, use_cache=True,
+                      formats=OUTPUT_FORMATS, progress=None, on_rows=None,
+                      isolation=Isolation(), incremental=False, queue=None, duplicates=None,
+                      schedule=None, origin=None, sources=None):
+    """
+    Processa os PDFs de um diretório, de um ZIP ou dos arquivos em memória
+    `sources` e salva os resultados nos formatos `formats`, devolvendo um resumo.
+    """
+    mixed = report is MIXED
+    # A fila (ver `fila`) não combina com os demais modos (incremental,
+    # duplicados e ordem de custo) nem com arquivos em memória
+    if sources is not None and (queue is not None or incremental):
+        raise ValueError("Arquivos em memória não podem ser combinados com a fila nem com "
+                         "o processamento incremental.")
+    if queue is not None and incremental:
+        raise ValueError("O processamento incremental não pode ser combinado com a fila.")
+    if queue is not None and duplicates:
+        raise ValueError("A detecção de duplicados não pode ser combinada com a fila.")
+    if queue is not None and schedule:
+        raise ValueError("O agendamento por custo não pode ser combinado com a fila.")
+    manifest = None
+    if incremental:
+        formats = ('csv',) + tuple(fmt for fmt in formats if fmt != 'csv')
+        manifest = Manifest(manifest_path(_output_dir(directory), report.output_name))
+    if use_cache and queue is None:
+        cache = ExtractionCache(report.name, _mixed_version() if mixed else report.version)
+    else:
+        cache = None
+    # Sem `progress`, o progresso é exibido no console
+    notify = progress or (lambda event: None)
+    # Identifica os arquivos no histórico e no índice de duplicados: um rótulo
+    # ou uma função da fonte de cada PDF
+    origin = origin or os.path.abspath(directory)
+    # Origem de cada arquivo gravado no histórico, quando ela depende da fonte
+    file_origins = {}
+    history_origin = file_origins.get if callable(origin) else origin
+
+    start_time = time.perf_counter()
+    errors = 0
+    first_result = None
+    pages = {'total': 0, 'lidas': 0}
+    profile = BatchProfile()
+    classify = {'segundos': 0.0, 'extracao_segundos': 0.0}
+    # Saídas de cada tipo de relatório: (caminhos, TabularWriter, _RowBuffer)
+    opened = {}
+    # Status dos arquivos gravados e ainda não registrados no manifesto
+    statuses = {}
+    with ExitStack() as stack:
+        batch = _list_sources(stack, report, directory, manifest, queue, statuses, sources)
+        scheduler = None
+        if schedule:
+            entries = batch.entries
+            if entries is None:
+                entries = list_pdfs(directory if sources is None else sources)
+            scheduler = _Schedule(report, entries, stack.enter_context(CostModel()), schedule)
+            sources = scheduler.sources
+        else:
+            sources = batch.sources
+        notify({'evento': 'inicio', 'tipo': report.name, 'diretorio': directory,
+                'arquivos': batch.total, 'workers': workers,
+                **({'ignorados': batch.skipped} if batch.skipped is not None else {})})
+
+        if not mixed:
+            opened[report.name] = _open_outputs(stack, report, directory, formats, profile,
+                                                on_rows, history_origin, manifest,
+                                                batch.committed)
+        pool = None
+        screen = None
+        if duplicates:
+            screen = _DuplicateScreen(report, origin,
+                                      stack.enter_context(FingerprintIndex()))
+        if queue is not None:
+            stack.enter_context(queue.local_workers(workers, isolation))
+            results = queue.results()
+        else:
+            if isolation is not None or workers > 1:
+                pool = stack.enter_context(IsolatedPool(workers, isolation))
+            results = iter_extract(report.extract, sources, workers, cache=cache, pool=pool,
+                                   screen=screen, ordered=scheduler is None)
+        from tqdm import tqdm
+        for index, result in enumerate(
+                tqdm(results, total=batch.total, desc="Processando PDFs", position=0,
+                     leave=True, disable=progress is not None), start=1):
+            if first_result is None:
+                first_result = time.perf_counter() - start_time
+            pdf_file = display_name(result.source)
+            error = result.error
+            stages = dict(result.stages)
+            file_report = report
+            if mixed:
+                report_type = (result.data['tipo'] if error is None
+                               else getattr(error, 'report_type', None))
+                file_report = load_report(report_type) if report_type else UNIDENTIFIED
+                if file_report.name not in opened:
+                    opened[file_report.name] = _open_outputs(
+                        stack, file_report, directory, formats, profile, None,
+                        history_origin, manifest, batch.committed)
+                if not result.cached:
+                    classify['segundos'] += stages.get('classify', 0.0)
+                    classify['extracao_segundos'] += result.seconds
+            rows = []
+            if error is None:
+                rows_start = time.perf_counter()
+                try:
+                    rows = file_report.rows(result.data, pdf_file)
+                except Exception as e:
+                    error = e
+                stages['rows'] = time.perf_counter() - rows_start
+            duplicate = isinstance(error, DuplicateReport)
+            if duplicate:
+                status, message = 'Duplicado', f"Duplicado de {error.original}"
+                if duplicates == MARK:
+                    rows = [file_report.status_row(pdf_file, message)]
+            elif error is not None:
+                errors += 1
+                status, message = 'Erro', f"Erro: {error}"
+                rows = [file_report.error_row(pdf_file, error)]
+            else:
+                status = message = 'Concluído'
+                if screen is not None:
+                    screen.register(pdf_file)
+            statuses[pdf_file] = status
+            if callable(origin) and HISTORY in formats:
+                file_origins[pdf_file] = origin(result.source)
+            opened[file_report.name][2].add(pdf_file, rows)
+            if mixed and on_rows is not None and (rows or not duplicate):
+                on_rows(pdf_file, [[pdf_file, file_report.name, message]])
+            file_pages = _page_stats(result.data)
+            pages['total'] += file_pages.get('paginas', 0)
+            pages['lidas'] += file_pages.get('paginas_lidas', 0)
+            if not result.cached and not duplicate:
+                profile.add_file(pdf_file, result.seconds + stages.get('rows', 0.0), stages)
+                if scheduler is not None:
+                    scheduler.record(pdf_file, result.seconds)
+
+            notify({'evento': 'arquivo', 'indice': index, 'total': batch.total,
+                    'arquivo': pdf_file, 'status': status,
+                    'erro': str(error) if error and not duplicate else None,
+                    'linhas': len(rows),
+                    'segundos': round(result.seconds, 4), 'cache': result.cached,
+                    **({'tipo': file_report.name} if mixed else {}),
+                    **({'duplicado_de': error.original} if duplicate else {}), **file_pages})
+        for _, _, buffer in opened.values():
+            buffer.flush()
+        if manifest is not None:
+            for paths, writer, buffer in opened.values():
+                _export_incremental(buffer.report, paths, manifest, writer.rows_written > 0)
+            manifest.commit(batch.refreshed)
+
+    summary = _summary(report, directory, batch, opened, time.perf_counter() - start_time,
+                       first_result, errors, pages, profile, cache, pool, queue, scheduler,
+                       screen, classify)
+    notify(summary)
+    return summary
+
+
+def watch_directory(report, directory, interval, progress=None, **options):
+    """
+    Observa um diretório, processando-o de forma incremental (ver
+    `process_directory`) a cada `interval` segundos até ser interrompido:
+    cada execução extrai apenas os PDFs que chegaram ou mudaram desde a
+    anterior. Erros de uma execução são informados a `progress` como um
+    evento 'erro' e não encerram a observação.
+    """
+    notify = progress or (lambda event: None)
+    while True:
+        try:
+            process_directory(report, directory, progress=progress, incremental=True,
+                              **options)
+        except Exception as e:
+            notify({'evento': 'erro', 'mensagem': str(e)})
+        time.sleep(interval)
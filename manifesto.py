@@ -0,0 +1,138 @@
+import datetime
+import os
+import sqlite3
+from collections import namedtuple
+
+from cache_extracao import content_hash
+from fontes import (ZIP_ERRORS, UnreadableZip, is_zip, iter_zip_pdfs, list_entries, load_zip_pdf,
+                    pdf_count, zip_pdf_names)
+
+# Estado gravado para um ZIP inteiro (seus PDFs têm entradas próprias)
+ZIP_STATUS = 'zip'
+
+# PDF a processar em uma execução incremental: `load()` devolve a fonte
+# (caminho ou PdfBuffer) a entregar ao extrator
+PendingFile = namedtuple('PendingFile', 'name size mtime hash load')
+
+
+def manifest_path(output_dir, output_name):
+    return os.path.join(output_dir, f".manifesto_{output_name}.sqlite3")
+
+
+class Manifest:
+    """
+    Registro dos arquivos já processados em um diretório (caminho, tamanho,
+    data de modificação, hash do conteúdo e status), usado pelo processamento
+    incremental (ver `lote.process_directory`).
+
+    Também guarda as posições de cada saída (`offset`): até onde o CSV contém
+    apenas linhas de arquivos registrados e até onde ele já foi exportado para
+    Parquet. As entradas e as posições de uma mesma etapa são gravadas em uma
+    única transação (`commit`), de modo que, após uma interrupção, o
+    processamento recomeça exatamente do último ponto registrado.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def __enter__(self):
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY, tamanho INTEGER, mtime REAL, hash TEXT,
+                status TEXT, processado_em TEXT);
+            CREATE TABLE IF NOT EXISTS saidas (saida TEXT PRIMARY KEY, posicao INTEGER);
+        ''')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.close()
+        return False
+
+    def get(self, name):
+        """
+        (tamanho, mtime, hash, status) registrados para `name`, ou None.
+        """
+        return self._conn.execute(
+            "SELECT tamanho, mtime, hash, status FROM arquivos WHERE caminho = ?",
+            (name,)).fetchone()
+
+    def offset(self, output):
+        row = self._conn.execute("SELECT posicao FROM saidas WHERE saida = ?",
+                                 (output,)).fetchone()
+        return row[0] if row else 0
+
+    def commit(self, entries=(), offsets=None):
+        """
+        Registra, de uma só vez, as entradas (nome, tamanho, mtime, hash,
+        status) e as posições das saídas.
+        """
+        now = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?, ?)",
+                [(*entry, now) for entry in entries])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO saidas VALUES (?, ?)", (offsets or {}).items())
+
+    def _unchanged(self, name, size, mtime):
+        known = self.get(name)
+        return known is not None and known[0] == size and known[1] == mtime
+
+    def _same_content(self, name, digest):
+        known = self.get(name)
+        return known is not None and known[2] == digest
+
+    def pending(self, directory):
+        """
+        PDFs de `directory` (inclusive os de arquivos ZIP) que ainda não foram
+        processados ou mudaram desde o registro, e a quantidade dos que foram
+        ignorados por estarem inalterados.
+
+        Arquivos com o mesmo tamanho e data de modificação do registro nem são
+        lidos; os demais são comparados pelo hash do conteúdo, de modo que um
+        arquivo apenas copiado ou tocado não é extraído de novo. Um ZIP
+        alterado é percorrido membro a membro, e só os PDFs novos ou
+        modificados nele são processados. Devolve também as entradas dos
+        arquivos tocados e dos ZIPs, que devem ser registradas (`commit`) ao
+        fim do processamento.
+        """
+        pending, refreshed = [], []
+        skipped = 0
+        for entry in list_entries(directory):
+            stat = os.stat(entry)
+            name = os.path.basename(entry)
+            if self._unchanged(name, stat.st_size, stat.st_mtime):
+                skipped += pdf_count(entry)
+                continue
+            if not is_zip(entry):
+                digest = content_hash(entry)
+                known = self.get(name)
+                if known is not None and known[2] == digest:
+                    refreshed.append((name, stat.st_size, stat.st_mtime, digest, known[3]))
+                    skipped += 1
+                else:
+                    pending.append(PendingFile(name, stat.st_size, stat.st_mtime, digest,
+                                               lambda entry=entry: entry))
+                continue
+
+            try:
+                zip_pdf_names(entry)
+            except ZIP_ERRORS as e:
+                # ZIP ilegível: registrado com o seu nome e o status do erro, como um PDF
+                pending.append(PendingFile(
+                    name, stat.st_size, stat.st_mtime, None,
+                    lambda entry=entry, error=e: UnreadableZip(entry, error)))
+                continue
+            for buffer in iter_zip_pdfs(entry):
+                digest = content_hash(buffer)
+                if self._same_content(buffer.name, digest):
+                    skipped += 1
+                    continue
+                member = buffer.name[len(name) + 1:]
+                pending.append(PendingFile(
+                    buffer.name, len(buffer.getbuffer()), stat.st_mtime, digest,
+                    lambda entry=entry, member=member: load_zip_pdf(entry, member)))
+            refreshed.append((name, stat.st_size, stat.st_mtime, None, ZIP_STATUS))
+        return pending, skipped, refreshed
@@ -0,0 +1,31 @@
+import streamlit as st
+
+from componentes import batch_options, show_job, start_batch
+from lote import MIXED
+
+
+def show_mixed_page():
+    st.header("🔀Lote Misto")
+    st.caption("O tipo de cada relatório (químico ou dosimetria) é identificado "
+               "automaticamente pelo cabeçalho da primeira página, e cada arquivo é "
+               "extraído e gravado nas saídas do seu tipo.")
+
+    uploaded_files = st.file_uploader(
+        "Faça upload de múltiplos arquivos PDF ou ZIP",
+        accept_multiple_files=True,
+        type=['pdf', 'zip'],
+        key="lote_misto"
+    )
+
+    options = batch_options(
+        MIXED,
+        "Relatórios já processados sob outro nome (mesmo número de relatório ou "
+        "mesmo avaliado e dose) não são extraídos novamente e ficam marcados como "
+        "duplicados",
+        parquet=False
+    )
+
+    if st.button("🚀 Iniciar extração dos dados"):
+        start_batch(MIXED, uploaded_files, options)
+
+    show_job(MIXED)
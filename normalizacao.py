@@ -0,0 +1,29 @@
+# Número no formato brasileiro, com ou sem separador de milhar ("1.234,5", "85,3", "82").
+# Um ponto depois de um zero inicial é sempre decimal ("0.005"): o primeiro grupo
+# de milhar nunca começa com zero
+_NUMBER = r'([1-9]\d{0,2}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?)'
+_THOUSANDS = r'[1-9]\d{0,2}(?:\.\d{3})+'
+
+
+def to_number(values):
+    """
+    Converte, de uma só vez, uma coluna de textos com números no formato
+    brasileiro ("1.234,5", "1.234", "0.005", "85,3%", "82,1 dB(A)", "< 0,01")
+    em float.
+    Valores sem número ("-", "N/A", "ND", None) viram NaN.
+    """
+    import pandas as pd
+    text = pd.Series(values).astype('string')
+    number = text.str.extract(_NUMBER, expand=False)
+    thousands = number.str.contains(',', regex=False) | number.str.fullmatch(_THOUSANDS)
+    number = number.where(~thousands.fillna(False), number.str.replace('.', '', regex=False))
+    return pd.to_numeric(number.str.replace(',', '.', regex=False),
+                         errors='coerce').astype('float64')
+
+
+def ratio(numerator, denominator):
+    """
+    Razão entre duas colunas numéricas; NaN onde o denominador é nulo ou ausente.
+    """
+    return numerator / denominator.where(denominator > 0)
+
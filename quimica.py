@@ -1,133 +1,243 @@
-import streamlit as st
 import pdfplumber
-import pandas as pd
-import re
-import os
-import openpyxl
-import csv
-import time
-from tqdm import tqdm
-
-
-def extract_pdf_data(pdf_path):
-    """
-    Extrai informações-chave de um relatório de análise química em PDF.
-    """
-    extracted_data = {
-        'empresa_avaliada': None,
-        'amostrador': None,
-        'metodologia': None,
-        'dados_tabela': None,
-        'numero_relatorio': None
-    }
-
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            page = pdf.pages[0]
-            text = page.extract_text()
+import bisect
+import itertools
+from lote import ReportType
+from instrumentacao import stage
+from campos import FieldSpec, ReportSpec, TableSpec, extract_fields
+from duplicatas import normalize as normalize_fingerprint
+from normalizacao import ratio, to_number
+
+# Incrementar sempre que a lógica de extração mudar, invalidando o cache
+EXTRACTOR_VERSION = 7
+
+# Altura (em pontos) da margem inferior da página tratada como rodapé ("Página
+# N de M", endereço do laboratório), ignorada ao decidir se a tabela continua
+FOOTER_MARGIN = 60
+
+FIELDS = ReportSpec(
+    [
+        FieldSpec('empresa_avaliada', r'Empresa avaliada:\s*([^\n|]+)', required=True),
+        FieldSpec('amostrador', r'Nº do Amostrador:\s*([\w-]+)', required=True),
+        FieldSpec('metodologia', r'3 - MÉTODO\s*\(s\)\s*\n(.*?)(?=\n4 -|$)'),
+        FieldSpec('numero_relatorio', r'Relatório de Análise - Nº\s*(\d+-\d+)', required=True),
+    ],
+    table=TableSpec(
+        columns=['Agente Químico', 'Unidade', 'Resultado',
+                 'MP 8h', 'Teto', 'TWA', 'STEL', 'Ceiling', 'LD'],
+        row_pattern=r'ppm|mg/m³',
+    ),
+)
+
+
+def _extract_table(page, table):
+    """
+    Equivalente a `table.extract()` do pdfplumber, mas percorre os caracteres da
+    página uma única vez, distribuindo-os entre as linhas da tabela por busca
+    binária, em vez de varrer todos os caracteres novamente para cada linha.
+    """
+    rows = table.rows
+    tops = [row.bbox[1] for row in rows]
+    max_bottoms = list(itertools.accumulate((row.bbox[3] for row in rows), max))
+    row_chars = [[] for _ in rows]
+
+    for char in page.chars:
+        v_mid = (char['top'] + char['bottom']) / 2
+        h_mid = (char['x0'] + char['x1']) / 2
+        i = bisect.bisect_right(tops, v_mid) - 1
+        while i >= 0 and max_bottoms[i] > v_mid:
+            x0, _, x1, bottom = rows[i].bbox
+            if x0 <= h_mid < x1 and v_mid < bottom:
+                row_chars[i].append(char)
+            i -= 1
+
+    table_rows = []
+    for row, chars in zip(rows, row_chars):
+        cells = []
+        for cell in row.cells:
+            if cell is None:
+                cells.append(None)
+                continue
+            x0, top, x1, bottom = cell
+            cell_chars = [
+                char for char in chars
+                if x0 <= (char['x0'] + char['x1']) / 2 < x1
+                and top <= (char['top'] + char['bottom']) / 2 < bottom
+            ]
+            cells.append(pdfplumber.utils.extract_text(cell_chars) if cell_chars else '')
+        table_rows.append(cells)
+    return table_rows
+
+
+def _table_continues(page, table):
+    """
+    Indica se a tabela continua na próxima página: nada é impresso abaixo dela,
+    exceto no rodapé (a margem inferior da página ou o texto abaixo da última
+    linha horizontal desenhada depois da tabela).
+    """
+    bottom = table.bbox[3]
+    footer_top = page.bbox[3] - FOOTER_MARGIN
+    rules = [edge['top'] for edge in page.horizontal_edges if edge['top'] > bottom + 1]
+    if rules:
+        footer_top = min(footer_top, max(rules))
+    return not any(bottom <= char['top'] < footer_top for char in page.chars)
 
-            # Extração de campos específicos
-            extracted_data['empresa_avaliada'] = re.search(
-                r'Empresa avaliada:\s*([^\n|]+)', text).group(1).strip()
-
-            extracted_data['amostrador'] = re.search(
-                r'Nº do Amostrador:\s*([\w-]+)', text).group(1).strip()
-
-            metodologia_match = re.search(
-                r'3 - MÉTODO\s*\(s\)\s*\n(.*?)(?=\n4 -|$)', text)
-            if metodologia_match:
-                extracted_data['metodologia'] = metodologia_match.group(
-                    1).strip()
-
-            extracted_data['numero_relatorio'] = re.search(
-                r'Relatório de Análise - Nº\s*(\d+-\d+)', text).group(1).strip()
-
-            # Extração da tabela
-            table = page.extract_tables()
-            if table and len(table[0]) > 1:
-                headers = ['Agente Químico', 'Unidade', 'Resultado',
-                           'MP 8h', 'Teto', 'TWA', 'STEL', 'Ceiling', 'LD']
-                data_rows = [
-                    [str(cell).strip()
-                     if cell else 'N/A' for cell in row[:len(headers)]]
-                    for row in table[0]
-                    if any(x in ' '.join(map(str, row)) for x in ['ppm', 'mg/m³'])
-                ]
-                if data_rows:
-                    extracted_data['dados_tabela'] = pd.DataFrame(
-                        data_rows, columns=headers)
-
-    except Exception as e:
-        raise Exception(f"Erro ao processar o arquivo {pdf_path}: {e}")
 
-    return extracted_data
+def _read_page(page, fields, need_table, mode):
+    """
+    Analisa uma página do relatório, completando em `fields` os campos ainda
+    não encontrados e, se `need_table`, extraindo a primeira tabela da página.
+    Devolve (linhas da tabela ou None, se a tabela continua na próxima página).
+    """
+    rows, continues, tables = None, False, []
+    if need_table or mode == 'regioes':
+        with stage('extract_tables'):
+            tables = page.find_tables()
+            if need_table and tables:
+                rows = (_extract_table(page, tables[0]) if mode == 'regioes'
+                        else tables[0].extract())
+                continues = _table_continues(page, tables[0])
+
+    if FIELDS.complete(fields):
+        return rows, continues
+    if mode == 'regioes':
+        # Os campos ficam no cabeçalho, acima da tabela: só essa região é lida,
+        # e a página inteira apenas se algum campo não estiver nela
+        with stage('extract_text'):
+            header_top = tables[0].bbox[1] if tables else page.bbox[3]
+            header_chars = [char for char in page.chars if char['bottom'] <= header_top]
+            header_text = pdfplumber.utils.extract_text(header_chars)
+        with stage('regex'):
+            FIELDS.search(header_text, fields)
+    if mode != 'regioes' or not FIELDS.complete(fields):
+        with stage('extract_text'):
+            text = page.extract_text()
+        with stage('regex'):
+            FIELDS.search(text, fields)
+    return rows, continues
+
 
+class _ResultsTable:
+    """
+    Tabela de resultados montada à medida que as páginas do relatório são lidas
+    (ver `extract_pdf_data`).
+    """
 
-def process_directory(directory):
+    def __init__(self, mode):
+        self.mode = mode
+        self.rows = None
+        self.continues = False
+
+    def read_page(self, page, fields):
+        """
+        Completa `fields` e a tabela com uma página e indica se a leitura pode
+        terminar: os campos obrigatórios foram encontrados e a tabela terminou.
+        """
+        rows, continues = _read_page(page, fields, self.rows is None or self.continues,
+                                     self.mode)
+        if rows and self.continues and self.rows and len(rows[0]) != len(self.rows[-1]):
+            # A tabela da página seguinte tem outras colunas: não é a
+            # continuação da tabela de resultados
+            rows, continues = None, False
+        if rows is not None:
+            self.rows = (self.rows or []) + rows
+        self.continues = rows is not None and continues
+        return self.rows is not None and not self.continues and not FIELDS.missing(fields)
+
+    def data_rows(self):
+        """
+        Linhas de dados da tabela com todas as colunas de FIELDS.table.columns
+        (as células ausentes ficam vazias), sem depender do pandas, ou None.
+        """
+        if not self.rows or len(self.rows) < 2:
+            return None
+        with stage('table_rows'):
+            data_rows = FIELDS.table_rows(self.rows)
+        if not data_rows:
+            return None
+        width = len(FIELDS.table.columns)
+        return [row + [None] * (width - len(row)) for row in data_rows]
+
+
+def extract_pdf_data(pdf_path, mode='regioes'):
     """
-    Processa todos os PDFs de um diretório e salva os resultados em arquivos Excel e CSV.
+    Extrai informações-chave de um relatório de análise química em PDF (caminho
+    ou arquivo em memória). `mode` é 'regioes' (padrão) ou 'pagina'.
     """
-    pdf_files = [f for f in os.listdir(directory) if f.endswith('.pdf')]
-    if not pdf_files:
-        raise Exception("Nenhum arquivo PDF encontrado no diretório.")
+    table = _ResultsTable(mode)
+    extracted_data = extract_fields(FIELDS, pdf_path, read_page=table.read_page)
+    extracted_data['dados_tabela'] = table.data_rows()
+    return extracted_data
 
-    excel_path = os.path.join(directory, "relatorios_quimica.xlsx")
-    csv_path = os.path.join(directory, "relatorios_quimica.csv")
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Dados Extraídos"
-    headers = ['EMPRESA AVALIADA', 'AMOSTRADOR', 'METODOLOGIA', 'NÚMERO RELATÓRIO',
-               'AGENTE QUÍMICO', 'UNIDADE', 'RESULTADO', 'MP 8h', 'TETO',
-               'TWA', 'STEL', 'CEILING', 'NOME DO ARQUIVO', 'STATUS']
-    ws.append(headers)
+# Colunas numéricas derivadas dos resultados (ver `normalize`)
+NUMERIC_COLUMNS = ['RESULTADO (NUM)', 'MP 8h (NUM)', 'TWA (NUM)', 'STEL (NUM)',
+                   'RAZÃO MP 8h', 'RAZÃO TWA', 'RAZÃO STEL']
 
-    with open(csv_path, mode='w', newline='', encoding='utf-8') as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(headers)
+HEADERS = ['EMPRESA AVALIADA', 'AMOSTRADOR', 'METODOLOGIA', 'NÚMERO RELATÓRIO',
+           'AGENTE QUÍMICO', 'UNIDADE', 'RESULTADO', 'MP 8h', 'TETO',
+           'TWA', 'STEL', 'CEILING'] + NUMERIC_COLUMNS + ['NOME DO ARQUIVO', 'STATUS']
 
-        start_time = time.time()  # Iniciar o cronômetro de tempo
-        total_files = len(pdf_files)
 
-        # Exibir o progresso do processamento com um "spinner"
-        with st.spinner(f"Processando {total_files} arquivos..."):
-            for pdf_file in tqdm(pdf_files, desc="Processando PDFs", position=0, leave=True):
-                full_path = os.path.join(directory, pdf_file)
-                try:
-                    data = extract_pdf_data(full_path)
-                    if data['dados_tabela'] is not None:
-                        for _, row in data['dados_tabela'].iterrows():
-                            row_data = [
-                                data['empresa_avaliada'], data['amostrador'],
-                                data['metodologia'], data['numero_relatorio'],
-                                row.get('Agente Químico', 'N/A'),
-                                row.get('Unidade', 'N/A'),
-                                row.get('Resultado', 'N/A'),
-                                row.get('MP 8h', 'N/A'), row.get('Teto', 'N/A'),
-                                row.get('TWA', 'N/A'), row.get('STEL', 'N/A'),
-                                row.get('Ceiling', 'N/A'), pdf_file, "Concluído"
-                            ]
-                            ws.append(row_data)
-                            csv_writer.writerow(row_data)
-                except Exception as e:
-                    ws.append(['N/A'] * 12 + [pdf_file, f"Erro: {e}"])
-                    csv_writer.writerow(
-                        ['N/A'] * 12 + [pdf_file, f"Erro: {e}"])
+def normalize(frame):
+    """
+    Acrescenta as colunas numéricas a um DataFrame com as colunas de texto de
+    HEADERS: os valores convertidos para float e a razão entre o resultado e
+    cada limite (MP 8h, TWA e STEL); razões acima de 1 indicam que o limite
+    foi ultrapassado. Opera sobre colunas inteiras de uma vez, seja um bloco
+    de linhas do lote ou o histórico consolidado.
+    """
+    result = to_number(frame['RESULTADO'])
+    columns = {'RESULTADO (NUM)': result}
+    for limit in ('MP 8h', 'TWA', 'STEL'):
+        value = to_number(frame[limit])
+        columns[f'{limit} (NUM)'] = value
+        columns[f'RAZÃO {limit}'] = ratio(result, value)
+    return frame.assign(**columns)
+
 
-        # Calcular o tempo total
-        end_time = time.time()
-        total_time = end_time - start_time
-        st.success(f"Processamento concluído! **Tempo total:** {
-                   total_time:.2f} segundos. \n**Arquivos Processados**: {total_files}")
+def report_fingerprint(text):
+    """
+    Impressão de um relatório para a detecção de duplicados: o número do
+    relatório ('Relatório de Análise - Nº'), lido do cabeçalho.
+    """
+    return normalize_fingerprint(FIELDS.search(text)['numero_relatorio'])
 
-        # Mostrar resumo de arquivos processados
-        st.write(f"**Arquivos Processados**: {total_files}")
-        st.write(f"**Tempo de Processamento**: {total_time:.2f} segundos")
 
-    wb.save(excel_path)
+def result_rows(data, pdf_file):
+    """
+    Converte os dados extraídos de um relatório nas linhas da planilha de saída
+    (uma por agente químico da tabela de resultados), sem as colunas numéricas.
+    """
+    if data['dados_tabela'] is None:
+        return []
+    report_fields = [data['empresa_avaliada'], data['amostrador'],
+                     data['metodologia'], data['numero_relatorio']]
+    # Colunas da tabela (FIELDS.table.columns) na ordem da planilha, exceto o LD
+    return [report_fields + row[:-1] + [pdf_file, "Concluído"]
+            for row in data['dados_tabela']]
+
+
+REPORT = ReportType(
+    name='quimica',
+    extract=extract_pdf_data,
+    version=EXTRACTOR_VERSION,
+    headers=HEADERS,
+    rows=result_rows,
+    output_name='relatorios_quimica',
+    numeric_columns=NUMERIC_COLUMNS,
+    normalize=normalize,
+    company_column='EMPRESA AVALIADA',
+    index_columns=['EMPRESA AVALIADA', 'AGENTE QUÍMICO', 'AMOSTRADOR',
+                   'NÚMERO RELATÓRIO'],
+    fingerprint=report_fingerprint,
+)
 
 
 def show_quimica_page():
+    import pandas as pd
+    import streamlit as st
+    from componentes import batch_options, choose_pdf, extract_upload, show_job, start_batch
+
     st.header("🧪Relatórios de Análises Químicas")
 
     tab1, tab2 = st.tabs(["📄 Arquivo Único", "📁 Processamento em Lote"])
@@ -135,98 +245,56 @@ def show_quimica_page():
     with tab1:
         st.markdown("### Extração de Dados - PDF Único")
         uploaded_file = st.file_uploader(
-            "Faça o upload do arquivo PDF",
-            type=["pdf"]
+            "Faça o upload do arquivo PDF (ou de um ZIP com PDFs)",
+            type=["pdf", "zip"]
+        )
+        capture_profile = st.checkbox(
+            "Capturar perfil de execução (cProfile)",
+            help="Mostra onde o tempo de extração deste arquivo é gasto"
         )
 
         if uploaded_file:
             with st.spinner("Processando o arquivo..."):
-                # Salvar arquivo temporário
-                temp_path = "temp_quimica.pdf"
-                with open(temp_path, "wb") as f:
-                    f.write(uploaded_file.read())
-
                 try:
-                    # Extrair dados do PDF
-                    extracted_data = extract_pdf_data(temp_path)
+                    # Extrair dados do PDF diretamente da memória
+                    # (memorizado na sessão: só é extraído de novo se o conteúdo mudar)
+                    extracted_data, stats = extract_upload(
+                        REPORT, choose_pdf(uploaded_file), capture_profile)
+                    if stats:
+                        with st.expander("🩺 Perfil de execução (cProfile)"):
+                            st.code(stats)
                     st.success("Dados extraídos com sucesso!")
+                    st.caption(f"Páginas lidas: {extracted_data['paginas_lidas']} de "
+                               f"{extracted_data['paginas']}")
 
                     # Exibir dados extraídos
                     st.subheader("Tabela Extraída")
                     if extracted_data["dados_tabela"] is not None:
-                        st.dataframe(extracted_data["dados_tabela"])
+                        st.dataframe(pd.DataFrame(extracted_data["dados_tabela"],
+                                                  columns=FIELDS.table.columns))
                     else:
                         st.warning("Nenhuma tabela encontrada no arquivo.")
 
                 except Exception as e:
                     st.error(f"Erro ao processar o arquivo: {e}")
 
-                finally:
-                    # Remover arquivo temporário
-                    os.remove(temp_path)
-
     with tab2:
         st.markdown("### Processamento em Lote")
 
         uploaded_files = st.file_uploader(
-            "Faça upload de múltiplos arquivos PDF",
+            "Faça upload de múltiplos arquivos PDF ou ZIP",
             accept_multiple_files=True,
-            type=['pdf']
+            type=['pdf', 'zip']
         )
 
-        use_directory = st.checkbox("Selecionar diretório no computador")
-
-        if use_directory:
-            directory = st.text_input(
-                "Informe o caminho do diretório contendo os PDFs:",
-                help="Digite o caminho completo para a pasta com PDFs"
-            )
+        options = batch_options(
+            REPORT,
+            "Relatórios já processados sob outro nome (mesmo número de relatório) "
+            "não são extraídos novamente e ficam marcados como duplicados na planilha"
+        )
 
         if st.button("🚀 Iniciar extração dos dados"):
-            with st.spinner("Processando arquivos..."):
-                try:
-                    if uploaded_files:
-                        # Process uploaded files
-                        all_results = []
-                        for uploaded_file in uploaded_files:
-                            temp_path = f"temp_{uploaded_file.name}"
-                            with open(temp_path, "wb") as f:
-                                f.write(uploaded_file.read())
-
-                            extracted_data = extract_pdf_data(temp_path)
-                            if extracted_data["dados_tabela"] is not None:
-                                extracted_data["dados_tabela"]["Arquivo_Origem"] = uploaded_file.name
-                                all_results.append(
-                                    extracted_data["dados_tabela"])
-                            os.remove(temp_path)
-
-                        # Consolidate results
-                        if all_results:
-                            consolidated_df = pd.concat(
-                                all_results, ignore_index=True)
-
-                            st.download_button(
-                                label="📥 Baixar como Excel",
-                                data=consolidated_df.to_excel(index=False),
-                                file_name="dados_processados.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
-
-                            st.success(
-                                f"✅ {len(all_results)} arquivos processados!")
-                        else:
-                            st.warning(
-                                "Nenhuma tabela encontrada nos arquivos")
-
-                    elif use_directory and directory:
-                        # Existing directory processing logic
-                        process_directory(directory)
-                        st.success(
-                            f"✅Arquivos processados no diretório: {directory}")
-
-                    else:
-                        st.warning(
-                            "Selecione arquivos ou um diretório para processar")
+            # O lote é executado em segundo plano; a página acompanha o progresso
+            start_batch(REPORT, uploaded_files, options)
 
-                except Exception as e:
-                    st.error(f"❌Erro durante o processamento: {e}")
+        show_job(REPORT)
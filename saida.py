@@ -0,0 +1,212 @@
+import csv
+import os
+import shutil
+from io import BytesIO
+
+# Quantidade de linhas acumuladas antes de descarregar o CSV no disco
+FLUSH_EVERY = 500
+
+# Caracteres que não podem aparecer no valor de uma partição Parquet
+_PARTITION_ESCAPES = str.maketrans({'%': '%25', '/': '%2F', '\\': '%5C', '=': '%3D', ':': '%3A'})
+
+
+class TabularWriter:
+    """
+    Grava as mesmas linhas em um CSV e em uma planilha Excel à medida que são
+    produzidas, sem manter o lote inteiro em memória.
+
+    A planilha usa o modo `write_only` do openpyxl, em que cada linha é
+    serializada assim que adicionada. O CSV é descarregado a cada
+    `flush_every` linhas, e a planilha é salva mesmo que o processamento seja
+    interrompido por uma exceção, preservando as linhas já gravadas. Qualquer
+    um dos caminhos pode ser None para não gerar aquele formato.
+
+    Com `append`, as linhas são acrescentadas ao fim de um CSV já existente
+    (o cabeçalho só é gravado em um arquivo novo); `checkpoint` descarrega o
+    CSV no disco e devolve a posição em que ele termina.
+    """
+
+    def __init__(self, csv_path, excel_path, headers, sheet_title="Dados Extraídos",
+                 flush_every=FLUSH_EVERY, append=False):
+        self.csv_path = csv_path
+        self.excel_path = excel_path
+        self.headers = headers
+        self.sheet_title = sheet_title
+        self.flush_every = flush_every
+        self.append_csv = append
+        self.rows_written = 0
+        self._csv_file = None
+        self._csv_writer = None
+        self._workbook = None
+        self._sheet = None
+
+    def __enter__(self):
+        if self.csv_path:
+            self._csv_file = open(self.csv_path, mode='a' if self.append_csv else 'w',
+                                  newline='', encoding='utf-8')
+            self._csv_writer = csv.writer(self._csv_file)
+            if self._csv_file.tell() == 0:
+                self._csv_writer.writerow(self.headers)
+        if self.excel_path:
+            import openpyxl
+            self._workbook = openpyxl.Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet(self.sheet_title)
+            self._sheet.append(self.headers)
+        return self
+
+    def append(self, row):
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(row)
+        if self._sheet is not None:
+            self._sheet.append(row)
+        self.rows_written += 1
+        if self._csv_file is not None and self.rows_written % self.flush_every == 0:
+            self._csv_file.flush()
+
+    def checkpoint(self):
+        self._csv_file.flush()
+        os.fsync(self._csv_file.fileno())
+        return self._csv_file.tell()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._csv_file is not None:
+                self._csv_file.close()
+        finally:
+            if self._workbook is not None:
+                self._workbook.save(self.excel_path)
+        return False
+
+
+def partition_path(root, **partitions):
+    """
+    Caminho de uma partição no estilo Hive (`raiz/chave=valor/...`). Os
+    caracteres reservados dos valores são codificados como em URLs, que é
+    como o pyarrow os lê de volta.
+    """
+    return os.path.join(root, *(f"{key}={str(value).translate(_PARTITION_ESCAPES)}"
+                                for key, value in partitions.items()))
+
+
+class PartitionedParquetWriter:
+    """
+    Grava as linhas de um tipo de relatório em um conjunto de dados Parquet
+    particionado por empresa (`raiz/empresa=.../part-0.parquet`), com esquema
+    tipado: colunas de texto como string e `numeric_columns` como float. Cada
+    tipo de relatório tem a sua própria raiz, pois as colunas diferem.
+
+    Cada partição tem um único arquivo, ao qual as linhas são acrescentadas em
+    grupos de até `flush_every` linhas, sem manter o lote inteiro em memória.
+    Os dados anteriores em `root` são substituídos; com `replace=False`, eles
+    são mantidos e as linhas vão para novos arquivos `part_name`.parquet.
+    """
+
+    def __init__(self, root, headers, numeric_columns, company_column,
+                 flush_every=FLUSH_EVERY, replace=True, part_name='part-0'):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.root = root
+        self.headers = list(headers)
+        self.flush_every = flush_every
+        self.replace = replace
+        self.part_name = part_name
+        self.schema = pa.schema([
+            (name, pa.float64() if name in numeric_columns else pa.string())
+            for name in self.headers])
+        self._text = [name not in numeric_columns for name in self.headers]
+        self._company = self.headers.index(company_column)
+        self._pending = {}
+        self._writers = {}
+
+    def __enter__(self):
+        if self.replace:
+            shutil.rmtree(self.root, ignore_errors=True)
+        return self
+
+    def append(self, row):
+        company = row[self._company] or 'N/A'
+        pending = self._pending.setdefault(company, [])
+        pending.append(row)
+        if len(pending) >= self.flush_every:
+            self._flush(company)
+
+    def _flush(self, company):
+        import pyarrow.parquet as pq
+
+        rows = self._pending.pop(company, None)
+        if not rows:
+            return
+        columns = [
+            [None if value is None else str(value) for value in values] if text else values
+            for text, values in zip(self._text, zip(*rows))
+        ]
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type)
+             for values, field in zip(columns, self.schema)], schema=self.schema)
+        writer = self._writers.get(company)
+        if writer is None:
+            directory = partition_path(self.root, empresa=company)
+            os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(os.path.join(directory, f"{self.part_name}.parquet"),
+                                      self.schema)
+            self._writers[company] = writer
+        writer.write_table(table)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            for company in list(self._pending):
+                self._flush(company)
+        finally:
+            for writer in self._writers.values():
+                writer.close()
+        return False
+
+
+def read_parquet_dataset(root):
+    """
+    Lê um conjunto de dados gravado por PartitionedParquetWriter como uma
+    tabela Arrow, com a coluna de partição 'empresa'.
+    """
+    import pyarrow.parquet as pq
+
+    return pq.read_table(root)
+
+
+def parquet_bytes(table):
+    """
+    Serializa uma tabela Arrow em um único arquivo Parquet em memória.
+    """
+    import pyarrow.parquet as pq
+
+    buffer = BytesIO()
+    pq.write_table(table, buffer)
+    return buffer.getvalue()
+
+
+def iter_csv_rows(csv_path, start=0, numeric_columns=()):
+    """
+    Linhas de um CSV gravado por TabularWriter a partir da posição `start`
+    (sem o cabeçalho), com as colunas `numeric_columns` convertidas de volta
+    para float e as células vazias como None.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        headers = next(csv.reader(f))
+        if start:
+            f.seek(start)
+        numeric = [name in numeric_columns for name in headers]
+        for row in csv.reader(f):
+            yield [None if value == '' else float(value) if is_number else value
+                   for value, is_number in zip(row, numeric)]
+
+
+def csv_to_excel(csv_path, excel_path, numeric_columns=(), sheet_title="Dados Extraídos"):
+    """
+    Gera a planilha Excel correspondente a um CSV gravado por TabularWriter,
+    linha a linha, sem carregá-lo inteiro em memória.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        headers = next(csv.reader(f))
+    with TabularWriter(None, excel_path, headers, sheet_title) as writer:
+        for row in iter_csv_rows(csv_path, numeric_columns=numeric_columns):
+            writer.append(row)
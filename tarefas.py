@@ -0,0 +1,229 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import lote
+from cache_extracao import content_hash
+from fontes import PdfBuffer
+from saida import read_parquet_dataset
+
+# Quantidade de lotes executados ao mesmo tempo, somando todas as sessões
+MAX_RUNNING_JOBS = int(os.environ.get('EXTRACAO_TAREFAS_SIMULTANEAS', 2))
+# Tarefas mantidas no registro (as concluídas mais antigas são descartadas)
+MAX_KEPT_JOBS = 50
+# Últimas linhas de cada tarefa mantidas para a visualização ao vivo
+LIVE_ROWS = 500
+# Prefixo da origem, no histórico e no índice de duplicados, dos arquivos
+# enviados pelo navegador (ver `upload_origin`)
+UPLOAD_ORIGIN = 'upload'
+# Pré-aquecimento ao iniciar o servidor (ver `warm_up`); 0 desativa
+WARM_UP = os.environ.get('EXTRACAO_AQUECIMENTO', '1') != '0'
+
+QUEUED = 'na fila'
+RUNNING = 'em execução'
+DONE = 'concluída'
+FAILED = 'erro'
+
+_executor = ThreadPoolExecutor(max_workers=MAX_RUNNING_JOBS, thread_name_prefix='extracao')
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+class Job:
+    """
+    Estado de um processamento em lote executado em segundo plano.
+
+    É atualizado pela thread que executa o lote, a partir dos eventos de
+    `lote.process_directory`, e lido pelas sessões do Streamlit por meio de
+    `snapshot`. Só as últimas `LIVE_ROWS` linhas ficam em memória; o resultado
+    completo está nos arquivos de saída (ou, para uploads, na planilha em
+    `excel` e, se pedida, na tabela Arrow em `parquet`). Em um lote misto
+    (`lote.MIXED`), `excel` associa cada tipo de relatório à sua planilha.
+    """
+
+    def __init__(self, report, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.report = report
+        self.label = label
+        self.status = QUEUED
+        self.total = 0
+        self.done = 0
+        self.errors = 0
+        self.current = None
+        self.rows = deque(maxlen=LIVE_ROWS)
+        self.summary = None
+        self.excel = None
+        self.parquet = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def _on_event(self, event):
+        with self._lock:
+            if event['evento'] == 'inicio':
+                self.total = event['arquivos']
+            elif event['evento'] == 'arquivo':
+                self.done = event['indice']
+                self.current = event['arquivo']
+                if event['status'] == 'Erro':
+                    self.errors += 1
+
+    def _on_rows(self, file_name, rows):
+        with self._lock:
+            self.rows.extend(rows)
+
+    def _set(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, name, value)
+
+    def snapshot(self):
+        """
+        Cópia consistente do estado atual, segura para ler de outra thread.
+        """
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                'id': self.id,
+                'tipo': self.report.name,
+                'origem': self.label,
+                'status': self.status,
+                'total': self.total,
+                'concluidos': self.done,
+                'erros': self.errors,
+                'atual': self.current,
+                'linhas': list(self.rows),
+                'resumo': self.summary,
+                'excel': self.excel,
+                'parquet': self.parquet,
+                'erro': self.error,
+                'segundos': end - self.started if self.started else 0.0,
+            }
+
+    @property
+    def is_finished(self):
+        return self.status in (DONE, FAILED)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def upload_origin(source):
+    """
+    Origem de um arquivo enviado pelo navegador: o hash do conteúdo, e não o
+    nome do arquivo, de modo que reenviar o mesmo relatório
+    substitui as suas linhas no histórico, e outro relatório com o mesmo nome
+    não apaga as do primeiro.
+    """
+    return f"{UPLOAD_ORIGIN}:{content_hash(source)[:16]}"
+
+
+def _process(job, directory, workers, use_cache, formats, duplicates, schedule, sources=None):
+    return lote.process_directory(job.report, directory, workers, use_cache, formats,
+                                  progress=job._on_event, on_rows=job._on_rows,
+                                  duplicates=duplicates, schedule=schedule,
+                                  origin=upload_origin if sources is not None else None,
+                                  sources=sources)
+
+
+def _run(job, directory, workers, use_cache, formats, duplicates, schedule, sources=None):
+    job._set(status=RUNNING, started=time.time())
+    try:
+        excel = parquet = None
+        if sources is None:
+            summary = _process(job, directory, workers, use_cache, formats, duplicates,
+                               schedule)
+        else:
+            # As saídas de um envio só existem durante o lote; o resultado fica em memória
+            with tempfile.TemporaryDirectory(prefix='extracao_') as directory:
+                summary = _process(job, directory, workers, use_cache, formats, duplicates,
+                                   schedule, sources)
+                if job.report is lote.MIXED:
+                    # Uma planilha por tipo de relatório encontrado no lote
+                    excel = {name: _read(paths['xlsx'])
+                             for name, paths in summary['saidas'].items()}
+                else:
+                    excel = _read(summary['saidas']['xlsx'])
+                    if lote.PARQUET in summary['saidas']:
+                        parquet = read_parquet_dataset(summary['saidas'][lote.PARQUET])
+        job._set(status=DONE, summary=summary, excel=excel, parquet=parquet)
+    except Exception as e:
+        job._set(status=FAILED, error=str(e))
+    finally:
+        job._set(finished=time.time())
+
+
+def _register(job, *args):
+    with _jobs_lock:
+        _jobs[job.id] = job
+        finished = [job_id for job_id, item in _jobs.items() if item.is_finished]
+        for job_id in finished[:max(len(_jobs) - MAX_KEPT_JOBS, 0)]:
+            del _jobs[job_id]
+    _executor.submit(_run, job, *args)
+    return job
+
+
+def submit_directory(report, directory, workers=1, use_cache=True,
+                     formats=lote.OUTPUT_FORMATS, duplicates=None, schedule=None):
+    """
+    Agenda o processamento dos PDFs de um diretório e devolve a tarefa criada.
+    Com `duplicates`, os relatórios duplicados são tratados conforme essa
+    política e, com `schedule`, os arquivos são extraídos nessa ordem de custo
+    (ver `lote.process_directory`).
+    """
+    return _register(Job(report, directory), directory, workers, use_cache, formats,
+                     duplicates, schedule)
+
+
+def submit_uploads(report, uploaded_files, workers=1, use_cache=True, parquet=False,
+                   history=False, duplicates=None, schedule=None):
+    """
+    Agenda o processamento de arquivos enviados pelo navegador (PDFs ou
+    arquivos ZIP com PDFs), lidos direto da memória. O conteúdo é copiado para
+    PdfBuffer, de modo que a tarefa não depende da sessão que a criou; a
+    planilha resultante fica disponível em `excel` e,
+    com `parquet`, os dados tipados ficam em uma tabela Arrow. Com `history`,
+    as linhas também são gravadas no histórico (ver `historico`), com a
+    origem `upload_origin` de cada arquivo, e, com
+    `duplicates`, os relatórios duplicados são tratados conforme essa política;
+    `schedule` é a ordem de extração por custo.
+    """
+    sources, names = [], set()
+    for uploaded_file in uploaded_files:
+        name = os.path.basename(uploaded_file.name)
+        # Nomes repetidos no mesmo envio são distinguidos nas planilhas
+        while name in names:
+            name = f"_{name}"
+        names.add(name)
+        sources.append(PdfBuffer(uploaded_file.getvalue(), name))
+    label = f"{len(uploaded_files)} arquivos enviados"
+    formats = ('xlsx',) + (lote.PARQUET,) * parquet + (lote.HISTORY,) * history
+    return _register(Job(report, label), None, workers, use_cache, formats, duplicates,
+                     schedule, sources)
+
+
+def warm_up():
+    """
+    Inicia, em segundo plano, o pré-aquecimento do servidor (ver
+    `lote.warm_up`), para que nem a primeira página de extração nem o
+    primeiro lote esperem pela importação das dependências e pela criação dos
+    processos. Devolve a thread, ou None se desativado por WARM_UP.
+    """
+    if not WARM_UP:
+        return None
+    thread = threading.Thread(target=lote.warm_up, name='aquecimento', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Os módulos do projeto ficam na raiz do repositório e o gerador de PDFs
+# sintéticos, em benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,101 @@
+import csv
+import math
+import os
+import re
+from io import BytesIO
+
+import pytest
+
+import dosimetria
+import lote
+import quimica
+from normalizacao import to_number
+from texto import PDFPLUMBER, open_text
+from pdf_sintetico import relatorio_dosimetria, relatorio_quimica, write_batch
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("1.234,5", 1234.5),
+    ("1.234", 1234.0),
+    ("1.234.567,89", 1234567.89),
+    ("0.005", 0.005),
+    ("12.5", 12.5),
+    ("85,3%", 85.3),
+    ("82,1 dB(A)", 82.1),
+    ("< 0,01", 0.01),
+    ("82", 82.0),
+])
+def test_to_number(text, expected):
+    assert to_number([text])[0] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('text', ["-", "N/A", "ND", "", None])
+def test_to_number_without_number(text):
+    assert math.isnan(to_number([text])[0])
+
+
+def _search_each(spec, text):
+    # Um `re.search` por campo, como os extratores faziam antes do ReportSpec
+    values = {}
+    for field in spec.fields:
+        match = re.search(field.pattern, text)
+        values[field.name] = field.parse(match.group(1)) if match else None
+    return values
+
+
+def _pdf_text(data):
+    with open_text(BytesIO(data), PDFPLUMBER) as document:
+        return '\n'.join(document.pages())
+
+
+QUIMICA_TEXTS = [
+    _pdf_text(relatorio_quimica(1)),
+    "Relatório de Análise - Nº 1234-24\nEmpresa avaliada: ACME Ltda | CNPJ 00\n"
+    "Nº do Amostrador: AB-12\n3 - MÉTODO (s)\nNIOSH 1501\n4 - RESULTADOS",
+    # Campo repetido: vale a primeira ocorrência; metodologia ausente
+    "Empresa avaliada: Primeira\nEmpresa avaliada: Segunda\nNº do Amostrador: X1",
+    "",
+]
+DOSIMETRIA_TEXTS = [
+    _pdf_text(relatorio_dosimetria(1)),
+    _pdf_text(relatorio_dosimetria(2, colunas=True)),
+    # "DOSE Projetada:" antes de "DOSE:", que não pode casar dentro dela
+    "DOSE Projetada: 90,5%\nDOSE: 85%\nIncremento de Duplicação Dose: 5\n"
+    "Nível de Exposição Normalizada (NEN): 82,1 dB(A)",
+]
+
+
+@pytest.mark.parametrize('spec, text', [(quimica.FIELDS, text) for text in QUIMICA_TEXTS]
+                         + [(dosimetria.FIELDS, text) for text in DOSIMETRIA_TEXTS])
+def test_search_matches_per_field_regexes(spec, text):
+    assert spec.search(text) == _search_each(spec, text)
+
+
+def test_search_keeps_values_already_found():
+    text = "Empresa avaliada: Nova\nNº do Amostrador: B-2"
+    values = quimica.FIELDS.search(text, {'empresa_avaliada': 'Anterior'})
+    assert values['empresa_avaliada'] == 'Anterior'
+    assert values['amostrador'] == 'B-2'
+
+
+def _incremental(directory):
+    events = []
+    lote.process_directory(quimica.REPORT, str(directory), use_cache=False,
+                           formats=('csv',), progress=events.append, isolation=None,
+                           incremental=True)
+    start = events[0]
+    return start['arquivos'], start['ignorados']
+
+
+def test_incremental_processes_only_new_files(tmp_path):
+    write_batch(str(tmp_path), 'quimica', 3)
+    assert _incremental(tmp_path) == (3, 0)
+    write_batch(str(tmp_path), 'quimica', 2, start=3)
+    assert _incremental(tmp_path) == (2, 3)
+    assert _incremental(tmp_path) == (0, 5)
+
+    with open(os.path.join(tmp_path, 'relatorios_quimica.csv'), encoding='utf-8') as f:
+        files = [row['NOME DO ARQUIVO'] for row in csv.DictReader(f)]
+    # Cada relatório gravado uma única vez, com uma linha por agente
+    assert sorted(set(files)) == [f"quimica_{i:06d}.pdf" for i in range(5)]
+    assert len(files) == 5 * 5
@@ -0,0 +1,152 @@
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams, LTTextBox
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from instrumentacao import stage
+
+# Backends de extração de texto (ver `open_text`)
+PDFPLUMBER = 'pdfplumber'
+PDFMINER = 'pdfminer'
+DEFAULT_BACKEND = PDFPLUMBER
+
+# Análise de layout do pdfminer ajustada para reproduzir as linhas do
+# `extract_text` do pdfplumber: caracteres na mesma linha de base formam uma
+# única linha (char_margin alto), espaços são inseridos a partir de
+# aproximadamente 3 pt de distância, como o x_tolerance do pdfplumber, e a
+# ordenação hierárquica dos blocos de texto, que o texto simples não usa, é
+# desativada (boxes_flow=None)
+LAYOUT = LAParams(line_overlap=0.5, char_margin=50.0, line_margin=0.0, word_margin=0.3,
+                  boxes_flow=None, detect_vertical=False, all_texts=False)
+# Distância vertical máxima (em pt) entre linhas do pdfminer unidas em uma
+# única linha de texto (o y_tolerance do pdfplumber)
+LINE_TOLERANCE = 3
+
+
+class _PdfplumberText:
+    """
+    Texto das páginas pelo pdfplumber (`page.extract_text`), a partir do
+    modelo completo de caracteres, o mesmo usado para tabelas e geometria.
+    """
+
+    def __init__(self, source):
+        import pdfplumber
+        self._pdf = pdfplumber.open(source)
+        self.page_count = len(self._pdf.pages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._pdf.close()
+        return False
+
+    def page_objects(self):
+        """
+        As páginas do pdfplumber, com o conteúdo já interpretado; os objetos de
+        cada página são liberados quando a seguinte é pedida.
+        """
+        for page in self._pdf.pages:
+            with stage('page_objects'):
+                # Leitura e interpretação do conteúdo da página pelo pdfminer
+                page.chars
+            yield page
+            # Libera os objetos já interpretados da página
+            page.close()
+
+    def pages(self):
+        for page in self.page_objects():
+            with stage('extract_text'):
+                text = page.extract_text()
+            yield text
+
+
+class _PdfminerText:
+    """
+    Texto das páginas direto do pdfminer, com a análise de layout LAYOUT: as
+    linhas de texto são ordenadas de cima para baixo e da esquerda para a
+    direita, as que estão na mesma altura são unidas e os espaços repetidos
+    são reduzidos a um, como no `extract_text` do pdfplumber, sem montar o
+    modelo de caracteres do pdfplumber.
+    """
+
+    def __init__(self, source):
+        self._file = open(source, 'rb') if isinstance(source, str) else None
+        try:
+            document = PDFDocument(PDFParser(self._file or source))
+            self._pages = list(PDFPage.create_pages(document))
+        except BaseException:
+            self.close()
+            raise
+        self.page_count = len(self._pages)
+        resources = PDFResourceManager()
+        self._device = PDFPageAggregator(resources, laparams=LAYOUT)
+        self._interpreter = PDFPageInterpreter(resources, self._device)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def pages(self):
+        for page in self._pages:
+            with stage('page_objects'):
+                self._interpreter.process_page(page)
+                layout = self._device.get_result()
+            with stage('extract_text'):
+                text = _layout_text(layout)
+            yield text
+
+
+def _layout_text(layout):
+    lines = sorted((line for box in layout if isinstance(box, LTTextBox) for line in box),
+                   key=lambda line: -line.y1)
+    # Agrupa as linhas pela altura e ordena cada grupo da esquerda para a direita
+    rows, top = [], None
+    for line in lines:
+        if rows and top - line.y1 <= LINE_TOLERANCE:
+            rows[-1].append(line)
+        else:
+            rows.append([line])
+        top = line.y1
+    text = []
+    for row in rows:
+        words = [word for line in sorted(row, key=lambda line: line.x0)
+                 for word in line.get_text().split()]
+        if words:
+            text.append(' '.join(words))
+    return '\n'.join(text)
+
+
+BACKENDS = {
+    PDFPLUMBER: _PdfplumberText,
+    PDFMINER: _PdfminerText,
+}
+
+
+def open_text(source, backend=DEFAULT_BACKEND):
+    """
+    Abre um PDF (caminho ou arquivo em memória) para a leitura do texto
+    simples das páginas com o backend `backend` (PDFPLUMBER ou PDFMINER).
+    Devolve um gerenciador de contexto com o total de páginas em
+    `page_count` e um gerador `pages()` com o texto de cada página, lido
+    apenas quando pedido; com PDFPLUMBER, `page_objects()` devolve as próprias
+    páginas do pdfplumber, para tabelas e geometria.
+
+    PDFMINER é mais rápido e produz as mesmas linhas de texto para os campos
+    procurados por expressões regulares, mas não oferece tabelas nem a
+    posição dos caracteres (ver `benchmarks/backends.py`).
+    """
+    try:
+        factory = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Backend de texto desconhecido: {backend}") from None
+    return factory(source)